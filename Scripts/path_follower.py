@@ -3,17 +3,28 @@
 
 """
 路径跟随程序
-将DFS算法生成的路径转换为小车控制命令
+将规划出的路径压缩为运动基元(转向角度, 直行距离)，再转换为小车控制命令
 """
 
 import time
+import queue
 from dfs import dfs
-from car_control import run
+from dstar_lite import DStarLite
+from grid import as_grid
+from path_cache import PathCache
+from path_simplify import simplify
+from car_control import get_controller, run
 import math
 
-def follow_path(matrix, start_x, start_y, end_x, end_y, speed=0.5, turn_speed=1.0, move_time=1.0):
+# 路径缓存，同一张地图上重复往返的规划请求直接复用结果
+path_cache = PathCache(max_entries=128)
+
+def follow_path(matrix, start_x, start_y, end_x, end_y, speed=0.5, turn_speed=1.0, move_time=1.0,
+                inflate_radius=0, algorithm='astar', use_cache=True, updates=None,
+                smooth=True, initial_heading=0.0, settle_time=0.0, path=None, cancel=None, progress=None,
+                poll_interval=0.05):
     """
-    让小车按照DFS算法找到的路径移动
+    让小车沿规划出的路径移动
     
     参数:
         matrix: 地图矩阵，0表示通道，1表示障碍物
@@ -21,118 +32,174 @@ def follow_path(matrix, start_x, start_y, end_x, end_y, speed=0.5, turn_speed=1.
         end_x, end_y: 终点坐标
         speed: 移动速度
         turn_speed: 转弯速度
-        move_time: 每步移动的时间(秒)
+        move_time: 每走一格所需的时间(秒)
+        inflate_radius: 障碍物膨胀半径(格子数)，用于给小车车身留出安全距离，
+                        可用 grid.footprint_radius 根据车身尺寸计算
+        algorithm: 路径搜索算法，大片空旷的地图可使用 'jps' 或 'hpa'，
+                   传入同一个Grid重复规划时，跳跃表/抽象图只计算一次
+        use_cache: 是否使用路径缓存(path_cache)，地图通过Grid.update修改后缓存自动失效
+        updates: 行驶过程中的地图变化队列(queue.Queue)，元素为 (格子列表, 是否为障碍物)。
+                 传入时使用D* Lite增量规划，只修复受影响的路径。直行过程中也会读取队列，
+                 地图变化时立即停车，按已行驶的时间估计所在格子后重新规划
+        smooth: 是否对路径做视线平滑(允许斜向直行)，为False时只合并同方向的连续步
+        initial_heading: 小车初始朝向(度)，0度对应地图的"向下"，90度对应"向右"
+        settle_time: 每个动作之后的停顿时间(秒)，默认不停顿：各段直接交给常驻的控制器，转向和直行之间不停车
+        path: 已经规划好的路径，传入时直接执行，不再重新规划（仍会在地图变化时修复）
+        cancel: threading.Event，被设置后立即停车并停止执行；
+                其他线程直接调用 CarController.cancel() 停车时同样停止执行
+        progress: 进度回调 progress(已完成段数, 总段数, 当前位置, 当前朝向)
+        poll_interval: 运动过程中检查 cancel 和 updates 的间隔(秒)
     
     返回:
         是否成功到达终点
     """
-    # 使用DFS算法找到路径
-    path = dfs(matrix, start_x, start_y, end_x, end_y)
+    # 地图只转换一次，膨胀后的障碍物直接参与规划
+    grid = as_grid(matrix, inflate_radius)
+    incremental = None
+    if updates is not None:
+        incremental = DStarLite(grid, (start_x, start_y), (end_x, end_y))
+        if path is None:
+            path = incremental.replan()
+    elif path is None:
+        if use_cache:
+            path = path_cache.find_path(grid, start_x, start_y, end_x, end_y, algorithm)
+        else:
+            path = dfs(grid, start_x, start_y, end_x, end_y, algorithm)
     
     if not path:
         print("无法找到从({},{})到({},{})的路径".format(start_x, start_y, end_x, end_y))
         return False
     
-    print("找到路径，共{}步:".format(len(path)))
-    for i, point in enumerate(path):
-        print("步骤 {}: ({}, {})".format(i+1, point[0], point[1]))
+    print("找到路径，共{}步".format(len(path) - 1))
     
     # 如果路径只有一个点（起点和终点相同），直接返回成功
     if len(path) <= 1:
         print("起点和终点相同，无需移动")
+        if incremental is not None:
+            incremental.close()
         return True
     
-    # 遍历路径点，转换为移动指令
-    current_direction = None  # 当前朝向，初始为None
-    
-    for i in range(1, len(path)):
-        prev_point = path[i-1]
-        current_point = path[i]
-        
-        # 计算移动方向
-        dx = current_point[0] - prev_point[0]
-        dy = current_point[1] - prev_point[1]
-        
-        # 确定移动方向
-        if dx == 1 and dy == 0:  # 向下移动
-            direction = 'down'
-        elif dx == -1 and dy == 0:  # 向上移动
-            direction = 'up'
-        elif dx == 0 and dy == 1:  # 向右移动
-            direction = 'right'
-        elif dx == 0 and dy == -1:  # 向左移动
-            direction = 'left'
-        else:
-            print("错误：路径中存在非相邻点")
+    # 将逐格路径压缩为运动基元(转向角度, 直行距离)，直行段一次走完，减少启停次数
+    heading = initial_heading
+    waypoints, primitives, _ = simplify(grid, path, heading, smooth)
+    _print_plan(waypoints, primitives)
+    
+    # 运动命令非阻塞地交给控制器，执行过程中轮询取消和地图变化
+    controller = get_controller()
+
+    def cancelled():
+        return cancel is not None and cancel.is_set()
+
+    def interrupted():
+        return cancelled() or (incremental is not None and _apply_updates(grid, updates))
+
+    k = 0
+    position = waypoints[0]
+    changed = False     # 直行途中已经读到的地图变化
+    stopped = False     # 其他线程直接调用了 controller.cancel()
+    while k < len(primitives):
+        if progress is not None:
+            progress(k, len(primitives), position, heading)
+        if cancelled() or stopped:
+            print("路径执行被{}，小车停在({},{})".format('取消' if cancelled() else '控制器中断',
+                                                  position[0], position[1]))
+            if incremental is not None:
+                incremental.close()
             return False
-        
-        # 将地图方向转换为小车控制命令
-        # 假设小车初始朝向为"向前"(forward)，对应地图的"向下"(down)
-        if current_direction is None:
-            # 第一步，根据初始方向设置
-            if direction == 'down':
-                move_cmd = 'forward'
-            elif direction == 'up':
-                move_cmd = 'back'
-            elif direction == 'right':
-                move_cmd = 'right'
-                # 先转向
-                print("小车右转")
-                run('right', turn_time, speed, turn_speed)
-                time.sleep(0.5)
-                # 然后前进
-                move_cmd = 'forward'
-            elif direction == 'left':
-                move_cmd = 'left'
-                # 先转向
-                print("小车左转")
-                run('left', turn_time, speed, turn_speed)
-                time.sleep(0.5)
-                # 然后前进
-                move_cmd = 'forward'
-            
-            current_direction = direction
-        else:
-            # 后续步骤，需要根据当前朝向和目标方向确定转向
-            if current_direction == direction:
-                # 方向相同，继续前进
-                move_cmd = 'forward'
-            elif (current_direction == 'down' and direction == 'up') or \
-                 (current_direction == 'up' and direction == 'down') or \
-                 (current_direction == 'left' and direction == 'right') or \
-                 (current_direction == 'right' and direction == 'left'):
-                # 需要掉头（180度转向）
-                print("小车掉头")
-                run('right', turn_time * 2, speed, turn_speed)  # 转两倍时间实现掉头
-                time.sleep(0.5)
-                move_cmd = 'forward'
-            elif (current_direction == 'down' and direction == 'right') or \
-                 (current_direction == 'right' and direction == 'up') or \
-                 (current_direction == 'up' and direction == 'left') or \
-                 (current_direction == 'left' and direction == 'down'):
-                # 需要右转
-                print("小车右转")
-                run('right', turn_time, speed, turn_speed)
-                time.sleep(0.5)
-                move_cmd = 'forward'
-            else:
-                # 需要左转
-                print("小车左转")
-                run('left', turn_time, speed, turn_speed)
-                time.sleep(0.5)
-                move_cmd = 'forward'
-            
-            current_direction = direction
-        
+
+        # 处理行驶过程中新出现(或消失)的障碍物，从当前位置修复剩余路径
+        if incremental is not None and (changed or _apply_updates(grid, updates)):
+            changed = False
+            incremental.move_to(position[0], position[1])
+            new_path = incremental.replan()
+            if not new_path:
+                print("地图变化后无法从({},{})到达终点".format(position[0], position[1]))
+                incremental.close()
+                return False
+            print("地图发生变化，已从({},{})重新规划路径，剩余{}步".format(
+                position[0], position[1], len(new_path) - 1))
+            waypoints, primitives, _ = simplify(grid, new_path, heading, smooth)
+            _print_plan(waypoints, primitives)
+            k = 0
+            continue
+
+        turn, distance = primitives[k]
+        target = waypoints[k + 1]
+        if abs(turn) > 1e-6:
+            # 转向时间按90度转向所需的 turn_time 等比例计算；转向途中只响应取消
+            print("小车{}转{:.0f}度".format('右' if turn > 0 else '左', abs(turn)))
+            elapsed, stopped = _drive(controller, 'right' if turn > 0 else 'left', turn_time * abs(turn) / 90.0,
+                                      speed, turn_speed, cancelled, poll_interval)
+            if elapsed is not None:
+                continue
+            if settle_time > 0:
+                time.sleep(settle_time)
+            heading = (heading + turn + 180.0) % 360.0 - 180.0
+
         # 执行移动命令
-        print("小车从({},{})移动到({},{})，执行: {}".format(
-            prev_point[0], prev_point[1], current_point[0], current_point[1], move_cmd))
-        run(move_cmd, move_time, speed, turn_speed)
-        time.sleep(0.5)  # 每步之间稍作停顿
+        print("小车从({},{})直行{:.2f}格到({},{})".format(
+            position[0], position[1], distance, target[0], target[1]))
+        duration = move_time * distance
+        elapsed, stopped = _drive(controller, 'forward', duration, speed, turn_speed, interrupted, poll_interval)
+        if elapsed is not None:
+            # 直行途中被取消、被中断或地图发生变化，按已行驶的时间估计当前所在的格子
+            fraction = min(elapsed / duration, 1.0) if duration > 0 else 1.0
+            position = (int(round(position[0] + (target[0] - position[0]) * fraction)),
+                        int(round(position[1] + (target[1] - position[1]) * fraction)))
+            changed = not cancelled() and not stopped
+            continue
+        if settle_time > 0:
+            time.sleep(settle_time)
+        k += 1
+        position = target
     
+    if progress is not None:
+        progress(len(primitives), len(primitives), waypoints[-1], heading)
+    if incremental is not None:
+        incremental.close()
     print("路径执行完成，小车已到达目标位置({},{})".format(end_x, end_y))
     return True
 
+def _drive(controller, direction, duration, speed, turn_speed, interrupted, poll_interval):
+    """
+    执行一段运动并等待完成，等待期间每隔 poll_interval 调用一次 interrupted()
+
+    返回:
+        (已执行的时间, 是否被其他线程停车)：正常完成时为 (None, False)；
+        interrupted() 返回True时立即停车，返回 (这段运动已经执行的时间(秒), False)；
+        其他线程直接调用 controller.cancel() 时返回 (已经执行的时间, True)
+    """
+    epoch = controller.command(direction, duration, speed, turn_speed)
+    started = time.monotonic()
+    while not controller.wait(poll_interval):
+        if interrupted():
+            controller.cancel()
+            return time.monotonic() - started, False
+    if controller.cancelled(epoch):
+        return time.monotonic() - started, True
+    return None, False
+
+def _print_plan(waypoints, primitives):
+    print("路径压缩为{}个路径点、{}段运动:".format(len(waypoints), len(primitives)))
+    for i, point in enumerate(waypoints):
+        print("路径点 {}: ({}, {})".format(i + 1, point[0], point[1]))
+
+def _apply_updates(grid, updates):
+    """
+    读取队列中所有的地图变化并应用到地图上
+
+    返回:
+        是否有格子的可通行状态发生了变化
+    """
+    changed = False
+    while True:
+        try:
+            cells, blocked = updates.get_nowait()
+        except queue.Empty:
+            return changed
+        if grid.update(cells, blocked):
+            changed = True
+
 def direct_path(start_x, start_y, end_x, end_y, speed=0.5, turn_speed=1.0, move_time=1.0):
     """
     让小车直接从起点移动到终点，不考虑障碍物
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+推理后端性能测试
+用 camera.VideoCamera 的模拟视频帧比较各推理后端的单帧延迟和批量吞吐量
+
+用法:
+    python benchmark_inference.py
+    python benchmark_inference.py --backends torch onnxruntime openvino --frames 200
+    python benchmark_inference.py --backends onnxruntime --int8 --batch 4
+
+onnxruntime / openvino 第一次运行时会导出模型（每种配置导出一次），导出时间不计入结果。
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from camera import VideoCamera
+from inference_backend import BACKENDS, DEFAULT_CONFIG, load_backend
+
+
+def mock_frames(count):
+    """从模拟视频中采集 count 帧"""
+    # 打不开的视频源会自动切换为模拟视频
+    cam = VideoCamera(source='mock://benchmark', mock_fps=1000.0)
+    frames = []
+    seq = 0
+    while len(frames) < count:
+        seq, frame = cam.wait_frame(seq, timeout=1.0)
+        if frame is not None:
+            frames.append(frame)
+    cam.release()
+    return frames
+
+
+def run(backend, frames, batch, warmup):
+    for frame in frames[:warmup]:
+        backend([frame])
+
+    latencies = []
+    for frame in frames:
+        t0 = time.perf_counter()
+        backend([frame])
+        latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    for start in range(0, len(frames), batch):
+        backend(frames[start:start + batch])
+    throughput = len(frames) / (time.perf_counter() - t0)
+    return np.array(latencies) * 1000, throughput
+
+
+def main():
+    parser = argparse.ArgumentParser(description="推理后端性能测试")
+    parser.add_argument('--backends', nargs='+', choices=list(BACKENDS), default=list(BACKENDS))
+    parser.add_argument('--weights', default=DEFAULT_CONFIG['weights'])
+    parser.add_argument('--imgsz', type=int, default=DEFAULT_CONFIG['imgsz'])
+    parser.add_argument('--batch', type=int, default=1, help="吞吐量测试的批大小（也是导出模型的固定批大小）")
+    parser.add_argument('--int8', action='store_true', help="onnxruntime / openvino 使用INT8量化模型")
+    parser.add_argument('--frames', type=int, default=100)
+    parser.add_argument('--warmup', type=int, default=10)
+    args = parser.parse_args()
+
+    frames = mock_frames(args.frames)
+    print("{:>12} {:>10} {:>10} {:>10} {:>10} {:>12}".format(
+        "backend", "load(s)", "mean(ms)", "p50(ms)", "p95(ms)", "throughput"))
+    for name in args.backends:
+        config = {'backend': name, 'weights': args.weights, 'imgsz': args.imgsz,
+                  'batch': args.batch, 'int8': args.int8}
+        t0 = time.perf_counter()
+        try:
+            backend = load_backend(config)
+        except Exception as e:
+            print("{:>12} 加载失败: {}".format(name, e))
+            continue
+        load_time = time.perf_counter() - t0
+        latencies, throughput = run(backend, frames, args.batch, args.warmup)
+        print("{:>12} {:>10.1f} {:>10.1f} {:>10.1f} {:>10.1f} {:>9.1f}fps".format(
+            name, load_time, latencies.mean(), np.percentile(latencies, 50), np.percentile(latencies, 95),
+            throughput))
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+路径规划性能测试
+在随机障碍物地图或仓库地图上比较各搜索算法的扩展节点数和耗时
+
+用法:
+    python benchmark_planner.py
+    python benchmark_planner.py --sizes 100 500 --density 0.25
+    python benchmark_planner.py --map warehouse --sizes 1000 4000 --algorithms astar jps hpa
+
+jps / hpa 第一次查询时会构建跳跃表/抽象图（每张地图一次），
+表中 "prep(ms)" 为第一次查询比后续查询多花的时间，"time(ms)" 为之后重复规划的耗时。
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from grid import Grid
+from planner import ALGORITHMS, plan
+
+
+def make_map(size, density, seed):
+    """生成随机障碍物地图，保证起点和终点可通行"""
+    rng = np.random.default_rng(seed)
+    grid = (rng.random((size, size)) < density).astype(np.uint8)
+    grid[0, 0] = 0
+    grid[-1, -1] = 0
+    return grid
+
+
+def make_warehouse(size, density, seed):
+    """生成仓库地图：大片空地上排列着货架，另有少量零散障碍物"""
+    rng = np.random.default_rng(seed)
+    grid = (rng.random((size, size)) < density * 0.01).astype(np.uint8)
+    for row in range(size // 20, size - size // 20, 40):
+        for col in range(size // 20, size - size // 20, 300):
+            grid[row:row + 4, col:col + 250] = 1
+    grid[0, 0] = 0
+    grid[-1, -1] = 0
+    return grid
+
+
+def legacy_dfs(matrix, start_x, start_y, end_x, end_y):
+    """原先的递归DFS实现，仅用于对比"""
+    rows, cols = len(matrix), len(matrix[0])
+    visited = set()
+    path = []
+    counter = [0]
+
+    def helper(x, y):
+        if x == end_x and y == end_y:
+            path.append([x, y])
+            return True
+        if x < 0 or y < 0 or x >= rows or y >= cols or matrix[x][y] != 0 or (x, y) in visited:
+            return False
+        visited.add((x, y))
+        counter[0] += 1
+        path.append([x, y])
+        for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
+            if helper(x + dx, y + dy):
+                return True
+        path.pop()
+        return False
+
+    helper(start_x, start_y)
+    return path, counter[0]
+
+
+def run_legacy(grid):
+    matrix = grid.tolist()
+    t0 = time.perf_counter()
+    try:
+        path, expansions = legacy_dfs(matrix, 0, 0, len(matrix) - 1, len(matrix) - 1)
+    except RecursionError:
+        return None
+    return len(path), expansions, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="路径规划性能测试")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 200, 500, 1000, 2000])
+    parser.add_argument('--density', type=float, default=0.2, help="障碍物比例")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--map', choices=['random', 'warehouse'], default='random', help="地图类型")
+    parser.add_argument('--algorithms', nargs='+', choices=list(ALGORITHMS), default=list(ALGORITHMS))
+    parser.add_argument('--no-legacy', action='store_true', help="不运行旧的递归DFS")
+    args = parser.parse_args()
+
+    print("{:>6} {:>10} {:>8} {:>12} {:>10} {:>10}".format(
+        "size", "algorithm", "length", "expansions", "time(ms)", "prep(ms)"))
+    for size in args.sizes:
+        if args.map == 'warehouse':
+            matrix = make_warehouse(size, args.density, args.seed)
+        else:
+            matrix = make_map(size, args.density, args.seed)
+
+        for name in args.algorithms:
+            # 每个算法使用新的Grid，避免共享预计算结果
+            grid = Grid(matrix)
+            first = plan(grid, 0, 0, size - 1, size - 1, name)
+            result = plan(grid, 0, 0, size - 1, size - 1, name)
+            prep = max(first.elapsed - result.elapsed, 0.0)
+            print("{:>6} {:>10} {:>8} {:>12} {:>10.1f} {:>10.1f}".format(
+                size, name, len(result.path), result.expansions, result.elapsed * 1000, prep * 1000))
+
+        if args.no_legacy:
+            continue
+        legacy = run_legacy(matrix)
+        if legacy is None:
+            print("{:>6} {:>10} {:>8}".format(size, "dfs(old)", "超出递归深度限制"))
+        else:
+            length, expansions, elapsed = legacy
+            print("{:>6} {:>10} {:>8} {:>12} {:>10.1f}".format(
+                size, "dfs(old)", length, expansions, elapsed * 1000))
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+视频采集
+每个视频源由一个采集线程持续读取，只保留最新的一帧（带帧序号）。
+视频流、截图、目标检测等所有使用者都从这个"最新帧"读取，不再各自调用 VideoCapture.read()，
+因此多个浏览器页面不会互相抢帧，RTSP缓冲区里积压的旧帧也不会被送给观看者。
+"""
+
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+class VideoCamera:
+    """
+    带采集线程的视频源
+
+    参数:
+        source: VideoCapture 的视频源（RTSP地址、视频文件或摄像头编号）
+        mock_fps: 无法打开视频源时，模拟视频的帧率
+        reconnect_delay: 视频流中断后重新连接前的等待时间(秒)
+        frame_event: 可选的 threading.Event，每采集到一帧时置位，多路视频源可以共用一个事件
+
+    发布出去的帧对象不会再被修改，使用者需要在帧上绘制时请先复制（或使用 get_current_frame）。
+    """
+
+    def __init__(self, source=0, mock_fps=30.0, reconnect_delay=1.0, frame_event=None):
+        self.source = source
+        self.mock_fps = mock_fps
+        self.reconnect_delay = reconnect_delay
+        self.frame_event = frame_event
+        self.video = None
+        # 尝试打开摄像头或视频流
+        try:
+            self.video = cv2.VideoCapture(source)
+            if not self.video.isOpened():
+                raise Exception("无法打开视频源")
+
+            self.use_mock = False
+            print("成功连接到视频源")
+        except Exception as e:
+            print(f"视频源初始化失败: {e}")
+            print("使用模拟视频代替")
+            self.use_mock = True
+            self.mock_frame_count = 0
+
+        self._condition = threading.Condition()
+        self._frame = None
+        self.seq = 0                # 最新帧的序号，从1开始，每采集一帧加一
+        self.timestamp = None       # 最新帧的采集时刻(time.monotonic)
+        self.dropped = 0            # 读取失败的次数
+        self._running = True
+        self._thread = threading.Thread(target=self._capture, name='camera-capture', daemon=True)
+        self._thread.start()
+
+    def __del__(self):
+        self.release()
+
+    def release(self):
+        """停止采集线程并释放视频源"""
+        if not getattr(self, '_running', False):
+            return
+        self._running = False
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread is not threading.current_thread():
+            self._thread.join(timeout=2.0)
+        if self.video is not None:
+            self.video.release()
+
+    def _publish(self, frame):
+        with self._condition:
+            self._frame = frame
+            self.seq += 1
+            self.timestamp = time.monotonic()
+            self._condition.notify_all()
+        if self.frame_event is not None:
+            self.frame_event.set()
+
+    def _capture(self):
+        if self.use_mock:
+            # 模拟视频按固定帧率生成
+            period = 1.0 / self.mock_fps
+            deadline = time.monotonic()
+            while self._running:
+                self._publish(self._mock_frame())
+                deadline += period
+                time.sleep(max(deadline - time.monotonic(), 0))
+            return
+
+        failures = 0
+        while self._running:
+            success, frame = self.video.read()
+            if success:
+                failures = 0
+                self._publish(frame)
+                continue
+
+            self.dropped += 1
+            failures += 1
+            if failures < 10:
+                time.sleep(0.01)
+                continue
+            # 连续读取失败，视频流可能已经断开，等待后重新连接
+            print("视频源读取失败，{}秒后重新连接".format(self.reconnect_delay))
+            self.video.release()
+            time.sleep(self.reconnect_delay)
+            if self._running:
+                self.video = cv2.VideoCapture(self.source)
+            failures = 0
+
+    def read(self):
+        """
+        非阻塞地读取最新帧
+
+        返回:
+            (帧序号, 帧)，还没有采集到任何帧时为 (0, None)
+        """
+        with self._condition:
+            return self.seq, self._frame
+
+    def wait_frame(self, after_seq=0, timeout=None):
+        """
+        等待比 after_seq 更新的帧
+
+        返回:
+            (帧序号, 帧)，超时时返回 (after_seq, None)
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self.seq > after_seq or not self._running, timeout):
+                return after_seq, None
+            if self.seq <= after_seq:
+                return after_seq, None
+            return self.seq, self._frame
+
+    def get_current_frame(self):
+        """获取当前视频帧的副本（不带JPEG编码），可以直接在上面绘制"""
+        _, frame = self.read()
+        return None if frame is None else frame.copy()
+
+    def _mock_frame(self):
+        # 创建模拟视频帧 - 更丰富的模拟场景
+        frame = np.zeros((480, 640, 3), dtype=np.uint8)
+
+        # 添加网格背景
+        for i in range(0, 640, 40):
+            cv2.line(frame, (i, 0), (i, 480), (20, 20, 20), 1)
+        for i in range(0, 480, 40):
+            cv2.line(frame, (0, i), (640, i), (20, 20, 20), 1)
+
+        # 添加移动的主要物体 - 红色小车
+        car_x = int(320 + 200 * np.sin(self.mock_frame_count / 30))
+        car_y = int(240 + 150 * np.cos(self.mock_frame_count / 20))
+
+        # 绘制小车车身
+        cv2.rectangle(frame, (car_x - 25, car_y - 15), (car_x + 25, car_y + 15), (0, 0, 255), -1)
+        # 绘制小车轮子
+        cv2.circle(frame, (car_x - 15, car_y + 15), 8, (30, 30, 30), -1)
+        cv2.circle(frame, (car_x + 15, car_y + 15), 8, (30, 30, 30), -1)
+        cv2.circle(frame, (car_x - 15, car_y - 15), 8, (30, 30, 30), -1)
+        cv2.circle(frame, (car_x + 15, car_y - 15), 8, (30, 30, 30), -1)
+
+        # 添加障碍物 - 绿色方块
+        obstacle_x = int(100 + 50 * np.sin(self.mock_frame_count / 15))
+        obstacle_y = int(100 + 50 * np.cos(self.mock_frame_count / 25))
+        cv2.rectangle(frame, (obstacle_x - 20, obstacle_y - 20), (obstacle_x + 20, obstacle_y + 20), (0, 255, 0), -1)
+
+        # 添加目标点 - 蓝色圆圈
+        target_x = int(500 + 30 * np.cos(self.mock_frame_count / 10))
+        target_y = int(400 + 30 * np.sin(self.mock_frame_count / 18))
+        cv2.circle(frame, (target_x, target_y), 15, (255, 0, 0), -1)
+        cv2.circle(frame, (target_x, target_y), 25, (255, 0, 0), 2)
+
+        # 更新帧计数
+        self.mock_frame_count += 1
+
+        return frame
+
+
+class CameraRegistry:
+    """
+    多路视频源
+
+    参数:
+        sources: {摄像头ID: 视频源}
+        camera_options: 传给 VideoCamera 的其他参数
+
+    摄像头在第一次 get() 时才打开，每路一个采集线程；所有摄像头共用 frame_event，
+    检测线程只需要等待这一个事件就能知道任意一路有了新帧。
+    """
+
+    def __init__(self, sources, **camera_options):
+        self.sources = dict(sources)
+        self.camera_options = camera_options
+        self.frame_event = threading.Event()
+        self._cameras = {}
+        self._lock = threading.Lock()
+
+    def ids(self):
+        return list(self.sources)
+
+    def get(self, cam_id):
+        """获取（必要时打开）指定的摄像头，ID不存在时返回 None"""
+        if cam_id not in self.sources:
+            return None
+        with self._lock:
+            cam = self._cameras.get(cam_id)
+        if cam is not None:
+            return cam
+        # 打开RTSP视频源可能需要几秒，不在锁内进行，避免阻塞其他摄像头
+        cam = VideoCamera(self.sources[cam_id], frame_event=self.frame_event, **self.camera_options)
+        with self._lock:
+            existing = self._cameras.setdefault(cam_id, cam)
+        if existing is not cam:
+            cam.release()
+        return existing
+
+    def opened(self):
+        """已经打开的摄像头 {摄像头ID: VideoCamera}"""
+        with self._lock:
+            return dict(self._cameras)
+
+    def release(self):
+        with self._lock:
+            cameras = list(self._cameras.values())
+            self._cameras.clear()
+        for cam in cameras:
+            cam.release()
@@ -6,9 +6,11 @@
 这个程序用于直接控制小车移动，无需键盘输入
 """
 
+import atexit
 import sys
 import time
 import threading
+from collections import deque
 
 # 导入ROS相关模块
 try:
@@ -28,8 +30,16 @@ TwistMsg = Twist
 
 # 重写PublishThread类，专为直接控制设计
 class PublishThread(threading.Thread):
-    def __init__(self, rate):
-        super(PublishThread, self).__init__()
+    """
+    /cmd_vel 发布线程
+
+    参数:
+        rate: 发布频率(Hz)，为0时只在收到新命令时发布
+        daemon: 是否为守护线程
+    """
+
+    def __init__(self, rate, daemon=False):
+        super(PublishThread, self).__init__(daemon=daemon)
         # 修改话题名称，确保与底盘控制器一致
         self.publisher = rospy.Publisher('/cmd_vel', TwistMsg, queue_size=1)
         self.x = 0.0
@@ -40,6 +50,9 @@ class PublishThread(threading.Thread):
         self.turn = 0.0
         self.condition = threading.Condition()
         self.done = False
+        self.dirty = False
+        self.jitter = TimingStats()
+        self.overruns = 0
 
         # 设置超时
         if rate != 0.0:
@@ -72,6 +85,7 @@ class PublishThread(threading.Thread):
         self.th = th
         self.speed = speed
         self.turn = turn
+        self.dirty = True
         # 通知发布线程有新消息
         self.condition.notify()
         self.condition.release()
@@ -81,27 +95,39 @@ class PublishThread(threading.Thread):
         self.update(0, 0, 0, 0, 0, 0)
         self.join()
 
+    def stats(self):
+        """定时发布的抖动(实际发布时刻与计划时刻之差)和超时(错过的发布周期数)统计"""
+        with self.condition:
+            result = self.jitter.as_dict()
+            result['overruns'] = self.overruns
+            return result
+
+    def _fill(self, twist):
+        # 将状态复制到twist消息中
+        twist.linear.x = self.x * self.speed
+        twist.linear.y = self.y * self.speed
+        twist.linear.z = self.z * self.speed
+        twist.angular.x = 0
+        twist.angular.y = 0
+        twist.angular.z = self.th * self.turn
+
     def run(self):
         twist_msg = TwistMsg()
         twist = twist_msg  # 简化版本，不使用stamped
 
-        while not self.done:
-            self.condition.acquire()
-            # 等待新消息或超时
-            self.condition.wait(self.timeout)
-
-            # 将状态复制到twist消息中
-            twist.linear.x = self.x * self.speed
-            twist.linear.y = self.y * self.speed
-            twist.linear.z = self.z * self.speed
-            twist.angular.x = 0
-            twist.angular.y = 0
-            twist.angular.z = self.th * self.turn
-
-            self.condition.release()
-
-            # 发布
-            self.publisher.publish(twist_msg)
+        if self.timeout is None:
+            while not self.done:
+                self.condition.acquire()
+                # 等待新消息
+                self.condition.wait(self.timeout)
+                self.dirty = False
+                self._fill(twist)
+                self.condition.release()
+
+                # 发布
+                self.publisher.publish(twist_msg)
+        else:
+            self._run_fixed_rate(twist_msg)
 
         # 线程退出时发布停止消息
         twist.linear.x = 0
@@ -112,62 +138,251 @@ class PublishThread(threading.Thread):
         twist.angular.z = 0
         self.publisher.publish(twist_msg)
 
+    def _run_fixed_rate(self, twist_msg):
+        """
+        按单调时钟以固定频率发布
+
+        每个周期的发布时刻是绝对时间 start + n * period，不会因为某次发布变慢而整体后移；
+        收到新命令时立即额外发布一次，不等到下一个周期。
+        """
+        period = self.timeout
+        next_tick = time.monotonic()
+        while not self.done:
+            with self.condition:
+                self.condition.wait_for(lambda: self.done or self.dirty,
+                                        max(next_tick - time.monotonic(), 0))
+                now = time.monotonic()
+                if now >= next_tick:
+                    late = now - next_tick
+                    self.jitter.add(late)
+                    missed = int(late / period)
+                    self.overruns += missed
+                    next_tick += period * (missed + 1)
+                self.dirty = False
+                self._fill(twist_msg)
+
+            self.publisher.publish(twist_msg)
+
+
+class TimingStats:
+    """累计时间误差的统计量（单位：秒，输出为毫秒）"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.total_sq += value * value
+        self.max = max(self.max, value)
+
+    def as_dict(self):
+        mean = self.total / self.count if self.count else 0.0
+        var = self.total_sq / self.count - mean * mean if self.count else 0.0
+        return {
+            'count': self.count,
+            'mean_ms': mean * 1000,
+            'std_ms': max(var, 0.0) ** 0.5 * 1000,
+            'max_ms': self.max * 1000,
+        }
+
+
+# 各方向对应的 (x, y, z, th) 移动参数，速度值已加大
+DIRECTIONS = {
+    'forward': (2, 0, 0, 0),
+    'back': (-2, 0, 0, 0),
+    'left': (0, 0, 0, 2),
+    'right': (0, 0, 0, -2),
+    'stop': (0, 0, 0, 0),
+}
+
+
+class CarController:
+    """
+    长期存在的小车控制器
+
+    持有唯一的 /cmd_vel 发布线程，命令以"定时段"的形式进入队列，由后台线程依次执行。
+    前一段到期后立即切换到下一段，中间不会停车，也不用每次重新创建发布者。
+    每段在单调时钟的绝对截止时间结束，不使用轮询，误差不会沿路径累积。
+
+    参数:
+        rate: 发布频率(Hz)，底盘控制器一般需要持续的速度命令，默认50Hz
+    """
+
+    def __init__(self, rate=50.0):
+        # 发布线程设为守护线程，进程退出时由 atexit 调用 shutdown 发送停止消息
+        self.pub_thread = PublishThread(rate, daemon=True)
+        self.pub_thread.wait_for_subscribers()
+        self._segments = deque()
+        self._condition = threading.Condition()
+        self._busy = False
+        self._closed = False
+        self._epoch = 0         # 每次 cancel 加一，用于打断正在执行的段
+        self._overshoot = TimingStats()   # 每段实际结束时刻与截止时间之差
+        self._worker = threading.Thread(target=self._execute, name='car-controller', daemon=True)
+        self._worker.start()
+
+    def command(self, direction, duration, speed_value=0.5, turn_value=1.0):
+        """
+        非阻塞地追加一段运动
+
+        参数:
+            direction: 移动方向('forward', 'back', 'left', 'right', 'stop')，
+                       或直接给出 (x, y, z, th) 移动参数
+            duration: 持续时间(秒)
+            speed_value: 线速度值
+            turn_value: 角速度值
+
+        返回:
+            提交时的取消代数，之后可以用 cancelled(代数) 判断这段运动是否被 cancel 打断
+        """
+        if isinstance(direction, str):
+            motion = DIRECTIONS.get(direction, DIRECTIONS['stop'])
+        else:
+            motion = tuple(direction)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("控制器已关闭")
+            self._segments.append((motion, duration, speed_value, turn_value))
+            self._condition.notify_all()
+            return self._epoch
+
+    def pending(self):
+        """队列中尚未开始执行的段数"""
+        with self._condition:
+            return len(self._segments)
+
+    def idle(self):
+        """当前没有正在执行或等待执行的运动"""
+        with self._condition:
+            return not self._busy and not self._segments
+
+    def stats(self):
+        """
+        时间统计
+
+        返回:
+            {'segments': 段结束时刻相对截止时间的延迟, 'publish': 定时发布的抖动和超时次数}
+        """
+        with self._condition:
+            segments = self._overshoot.as_dict()
+        return {'segments': segments, 'publish': self.pub_thread.stats()}
+
+    def wait(self, timeout=None):
+        """
+        等待队列中所有运动执行完毕
+
+        返回:
+            是否在超时前执行完毕
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: not self._busy and not self._segments, timeout)
+
+    def cancelled(self, epoch):
+        """command 返回 epoch 之后是否调用过 cancel（包括其他线程的调用）"""
+        with self._condition:
+            return self._epoch != epoch
+
+    def cancel(self):
+        """清空队列并立即停车"""
+        with self._condition:
+            self._segments.clear()
+            self._epoch += 1
+            self._condition.notify_all()
+
+    def shutdown(self):
+        """停车并结束发布线程"""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._segments.clear()
+            self._condition.notify_all()
+        self._worker.join()
+        self.pub_thread.stop()
+
+    def _execute(self):
+        condition = self._condition
+        while True:
+            with condition:
+                condition.wait_for(lambda: self._segments or self._closed)
+                if self._closed:
+                    return
+                self._busy = True
+                deadline = time.monotonic()
+
+            # 连续执行队列中的段，每段的截止时间从上一段的截止时间算起，不会累积延迟
+            while True:
+                with condition:
+                    if not self._segments or self._closed:
+                        break
+                    motion, duration, speed, turn = self._segments.popleft()
+                    epoch = self._epoch
+                x, y, z, th = motion
+                self.pub_thread.update(x, y, z, th, speed, turn)
+                deadline = max(deadline, time.monotonic() - duration) + duration
+                with condition:
+                    # cancel/shutdown 会唤醒等待，提前结束当前段
+                    interrupted = condition.wait_for(lambda: self._closed or self._epoch != epoch,
+                                                     max(deadline - time.monotonic(), 0))
+                    if not interrupted:
+                        self._overshoot.add(max(time.monotonic() - deadline, 0.0))
+                if rospy.is_shutdown():
+                    break
+
+            self.pub_thread.update(0, 0, 0, 0, 0, 0)
+            with condition:
+                self._busy = False
+                condition.notify_all()
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_controller(rate=50.0):
+    """
+    获取全局唯一的小车控制器（首次调用时创建，必要时初始化ROS节点）
+
+    参数:
+        rate: 发布频率(Hz)，只在第一次调用创建控制器时生效
+    """
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            if not rospy.core.is_initialized():
+                rospy.init_node('teleop_direct_control')
+            _controller = CarController(rate)
+            atexit.register(_controller.shutdown)
+        return _controller
+
 
 def run(direction, duration=2.0, speed_value=0.5, turn_value=1.0):
     """
     直接控制小车移动，无需键盘输入
 
+    阻塞直到动作完成。所有调用共用 get_controller() 返回的控制器和发布线程，
+    需要连续、不停顿地执行多段运动时，请直接使用 CarController.command。
+
     参数:
         direction: 移动方向，可选值：'forward', 'back', 'left', 'right', 'stop'
         duration: 移动持续时间(秒)
         speed_value: 线速度值
         turn_value: 角速度值
     """
-    # 初始化ROS节点（如果尚未初始化）
-    if not rospy.core.is_initialized():
-        rospy.init_node('teleop_direct_control')
-
-    # 设置速度参数
-    speed = speed_value
-    turn = turn_value
-
-    # 创建发布线程
-    pub_thread = PublishThread(0.0)
-    pub_thread.wait_for_subscribers()
-
-    # 根据方向设置移动参数，增加速度值
-    if direction == 'forward':
-        x, y, z, th = 2, 0, 0, 0  # 前进速度加大
-    elif direction == 'back':
-        x, y, z, th = -2, 0, 0, 0  # 后退速度加大
-    elif direction == 'left':
-        x, y, z, th = 0, 0, 0, 2  # 左转速度加大
-    elif direction == 'right':
-        x, y, z, th = 0, 0, 0, -2  # 右转速度加大
-    else:  # 默认停止
-        x, y, z, th = 0, 0, 0, 0
-
     try:
-        # 更新移动参数
-        pub_thread.update(x, y, z, th, speed, turn)
+        controller = get_controller()
+        controller.command(direction, duration, speed_value, turn_value)
         print("小车正在执行 {} 动作，持续 {} 秒".format(direction, duration))
-
-        # 使用循环来确保持续时间准确
-        start_time = time.time()
-        while time.time() - start_time < duration and not rospy.is_shutdown():
-            rospy.sleep(0.1)  # 小间隔检查时间
-
-        # 停止小车
-        pub_thread.update(0, 0, 0, 0, 0, 0)
+        controller.wait()
         print("小车已停止")
 
     except Exception as e:
         print("操作过程中出现错误: {}".format(e))
 
-    finally:
-        # 确保线程停止
-        pub_thread.stop()
-
 
 def ros_main():
     """
@@ -178,6 +393,7 @@ def ros_main():
     # 增加默认速度值
     default_speed = rospy.get_param('~speed', 1.0)  # 默认速度改为1.0
     default_turn = rospy.get_param('~turn', 2.0)  # 默认转向速度改为2.0
+    controller = get_controller(rospy.get_param('~rate', 50.0))
 
     try:
         rospy.loginfo("小车控制节点启动...")
@@ -197,7 +413,7 @@ def ros_main():
 
         run('stop')
 
-        rospy.loginfo("小车控制演示完成")
+        rospy.loginfo("小车控制演示完成，时间统计: {}".format(controller.stats()))
         rospy.spin()
 
     except rospy.ROSInterruptException:
@@ -1,3 +1,6 @@
+from planner import find_path
+
+
 def isvalid(matrix, x, y) -> bool:
     if matrix is None:
         print("none map")
@@ -6,30 +9,26 @@ def isvalid(matrix, x, y) -> bool:
         return False
     return matrix[x][y] == 0
 
-def dfs(matrix, start_x, start_y, end_x, end_y) -> list:
-    visited = set()
-    path = []
-    
-    def dfs_helper(x, y):
-        if x == end_x and y == end_y:
-            path.append([x, y])
-            return True
-
-        if not isvalid(matrix, x, y) or (x, y) in visited:
-            return False
-        visited.add((x, y))
-        path.append([x, y])
-        directions = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+def dfs(matrix, start_x, start_y, end_x, end_y, algorithm='astar') -> list:
+    """
+    兼容旧接口的路径规划函数
 
-        for dx, dy in directions:
-            if dfs_helper(x + dx, y + dy):
-                return True
+    原先的递归DFS在大地图上会超出递归深度限制，且找到的不是最短路径，
+    现在改为调用 planner 模块中的迭代式搜索引擎，返回最短路径。
 
-        path.pop()
-        return False
+    参数:
+        matrix: 地图矩阵（嵌套列表、NumPy数组或grid.Grid），0表示通道，1表示障碍物
+        start_x, start_y: 起点坐标
+        end_x, end_y: 终点坐标
+        algorithm: 搜索算法，可选 'bfs', 'astar', 'dijkstra'
 
-    dfs_helper(start_x, start_y)
-    return path
+    返回:
+        路径点列表 [[x, y], ...]，找不到路径时返回空列表
+    """
+    if matrix is None:
+        print("none map")
+        exit(1)
+    return find_path(matrix, start_x, start_y, end_x, end_y, algorithm)
 
 # 测试代码
 if __name__ == "__main__":
@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+增量路径规划 (D* Lite)
+
+从终点向起点反向搜索，并在两次规划之间保留 g / rhs 值和优先队列。
+地图上有格子变为障碍物或通道时，只修复受影响的节点，而不是重新搜索整张地图；
+小车前进后也只需移动起点，不用重新规划。
+
+参考: S. Koenig, M. Likhachev, "D* Lite", AAAI 2002
+"""
+
+import heapq
+import threading
+
+from grid import as_grid
+
+INF = float('inf')
+
+
+class DStarLite:
+    """
+    D* Lite 增量规划器
+
+    参数:
+        matrix: 地图（嵌套列表、NumPy数组或grid.Grid），通过Grid.update修改地图时
+                规划器会自动收到变化的格子，在下一次 replan 时修复路径
+        start: 起点坐标 (x, y)
+        goal: 终点坐标 (x, y)
+    """
+
+    def __init__(self, matrix, start, goal):
+        self.grid = as_grid(matrix)
+        self.start = self.grid.index(*start)
+        self.goal = self.grid.index(*goal)
+        self.last = self.start
+        self.km = 0
+        self.g = {}
+        self.rhs = {self.goal: 0}
+        self._heap = []
+        self._queued = {}       # 节点 -> 当前有效的key，堆中key不一致的条目视为已删除
+        self._pending = []      # 尚未处理的地图变化
+        self._lock = threading.Lock()
+        self.expansions = 0     # 累计扩展节点数
+
+        self._push(self.goal, self._key(self.goal))
+        self.grid.subscribe(self._on_map_changed)
+
+    def close(self):
+        """不再使用时取消对地图修改事件的订阅"""
+        self.grid.unsubscribe(self._on_map_changed)
+
+    def _h(self, a, b):
+        ax, ay = divmod(a, self.grid.stride)
+        bx, by = divmod(b, self.grid.stride)
+        return abs(ax - bx) + abs(ay - by)
+
+    def _key(self, s):
+        m = min(self.g.get(s, INF), self.rhs.get(s, INF))
+        return m + self._h(self.start, s) + self.km, m
+
+    def _push(self, s, key):
+        self._queued[s] = key
+        heapq.heappush(self._heap, (key, s))
+
+    def _top(self):
+        heap = self._heap
+        while heap:
+            key, s = heap[0]
+            if self._queued.get(s) == key:
+                return key, s
+            heapq.heappop(heap)
+        return (INF, INF), None
+
+    def _neighbors(self, s):
+        return [s + off for off in self.grid.offsets]
+
+    def _cost(self, a, b):
+        free = self.grid.free
+        return 1 if free[a] and free[b] else INF
+
+    def _update_vertex(self, s):
+        if s != self.goal:
+            g = self.g
+            self.rhs[s] = min((self._cost(s, n) + g.get(n, INF) for n in self._neighbors(s)), default=INF)
+        if self.g.get(s, INF) != self.rhs.get(s, INF):
+            self._push(s, self._key(s))
+        else:
+            self._queued.pop(s, None)
+
+    def _compute_shortest_path(self):
+        g = self.g
+        rhs = self.rhs
+        while True:
+            k_old, u = self._top()
+            if u is None:
+                break
+            start_key = self._key(self.start)
+            if not (k_old < start_key or rhs.get(self.start, INF) > g.get(self.start, INF)):
+                break
+            self.expansions += 1
+            k_new = self._key(u)
+            if k_old < k_new:
+                self._push(u, k_new)
+            elif g.get(u, INF) > rhs.get(u, INF):
+                g[u] = rhs[u]
+                self._queued.pop(u, None)
+                for s in self._neighbors(u):
+                    if s != self.goal and self.grid.free[s]:
+                        new_rhs = self._cost(s, u) + g[u]
+                        if new_rhs < rhs.get(s, INF):
+                            rhs[s] = new_rhs
+                        self._update_vertex_key(s)
+            else:
+                g[u] = INF
+                self._update_vertex(u)
+                for s in self._neighbors(u):
+                    if self.grid.free[s]:
+                        self._update_vertex(s)
+
+    def _update_vertex_key(self, s):
+        """rhs已经更新过时，只调整s在队列中的状态"""
+        if self.g.get(s, INF) != self.rhs.get(s, INF):
+            self._push(s, self._key(s))
+        else:
+            self._queued.pop(s, None)
+
+    def _on_map_changed(self, grid, old_fingerprint, changed):
+        with self._lock:
+            self._pending.extend(changed)
+
+    def update_cells(self, cells, blocked=True):
+        """修改地图上的格子，等价于 grid.update，变化会在下一次 replan 时处理"""
+        return self.grid.update(cells, blocked)
+
+    def move_to(self, x, y):
+        """小车移动到新位置后更新起点，已有的搜索结果继续有效"""
+        new_start = self.grid.index(x, y)
+        if new_start != self.start:
+            self.start = new_start
+
+    def replan(self):
+        """
+        处理积累的地图变化并修复最短路径
+
+        返回:
+            从当前起点到终点的路径点列表，无法到达时返回空列表
+        """
+        with self._lock:
+            changed = self._pending
+            self._pending = []
+
+        if changed or self.start != self.last:
+            self.km += self._h(self.last, self.start)
+            self.last = self.start
+        for x, y in changed:
+            u = self.grid.index(x, y)
+            self._update_vertex(u)
+            for s in self._neighbors(u):
+                self._update_vertex(s)
+
+        self._compute_shortest_path()
+        return self.path()
+
+    def path(self):
+        """沿 g 值下降方向提取当前的最短路径"""
+        grid = self.grid
+        if self.rhs.get(self.start, INF) == INF or not grid.free[self.start]:
+            return []
+        node = self.start
+        path = [list(grid.coords(node))]
+        limit = len(grid.free)
+        while node != self.goal and len(path) <= limit:
+            best, best_cost = None, INF
+            for s in self._neighbors(node):
+                cost = self._cost(node, s) + self.g.get(s, INF)
+                if cost < best_cost:
+                    best, best_cost = s, cost
+            if best is None:
+                return []
+            node = best
+            path.append(list(grid.coords(node)))
+        return path
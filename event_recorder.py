@@ -0,0 +1,284 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+事件录像
+在内存中循环保存一路摄像头最近 N 秒的JPEG帧和每一帧的检测结果，总字节数有上限。
+触发事件（调用 trigger，或者检测到指定类别的目标）时，把触发前 pre 秒到触发后 post 秒的帧
+在后台线程中写到磁盘：可以是一段视频，也可以是一组JPEG图片，另外附带每一帧的检测结果 metadata.json。
+录制线程只做JPEG编码，不等待磁盘；采集线程和检测线程都不受影响。
+"""
+
+import datetime
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+
+import cv2
+import numpy as np
+
+
+class RecordedFrame:
+    """环形缓冲区中的一帧"""
+
+    __slots__ = ('seq', 'timestamp', 'data', 'metadata')
+
+    def __init__(self, seq, timestamp, data, metadata):
+        self.seq = seq
+        self.timestamp = timestamp
+        self.data = data
+        self.metadata = metadata
+
+
+class RecordingEvent:
+    """一次触发的录像事件"""
+
+    def __init__(self, event_id, reason, triggered, pre, post, fmt):
+        self.id = event_id
+        self.reason = reason
+        self.triggered = triggered
+        self.start = triggered - pre
+        self.end = triggered + post
+        self.format = fmt
+        # recording / writing / done / failed
+        self.state = 'recording'
+        self.path = None
+        self.frames = 0
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+
+    def as_dict(self):
+        return {
+            'event_id': self.id,
+            'reason': self.reason,
+            'state': self.state,
+            'format': self.format,
+            'path': self.path,
+            'frames': self.frames,
+            'error': self.error,
+            'created': self.created,
+            'finished': self.finished,
+        }
+
+
+class EventRecorder:
+    """
+    一路摄像头的环形缓冲录像
+
+    参数:
+        camera: camera.VideoCamera
+        directory: 事件保存目录，每个事件一个子目录
+        seconds: 环形缓冲区保存的时长(秒)
+        fps: 写入缓冲区的帧率，低于视频帧率时跳过中间的帧
+        max_bytes: 缓冲区JPEG数据的总字节数上限，超出时丢弃最旧的帧
+        quality: JPEG质量
+        metadata: 可选的 metadata(seq) -> dict，返回该帧的检测结果等信息，与帧一起保存
+        rules: {类别名: 冷却时间(秒)}，检测到这些类别时自动触发事件，同一类别在冷却时间内只触发一次
+        pre / post: 事件默认包含触发前、后的秒数
+        fmt: 默认的保存格式，'video'（mp4视频）或 'frames'（JPEG图片序列）
+        name: 用于事件目录名的摄像头名称
+        history: 保留状态以供查询的事件数
+    """
+
+    def __init__(self, camera, directory, seconds=10.0, fps=10.0, max_bytes=64 * 1024 * 1024, quality=80,
+                 metadata=None, rules=None, pre=None, post=2.0, fmt='video', name='camera', history=50):
+        self.camera = camera
+        self.directory = directory
+        self.seconds = seconds
+        self.fps = fps
+        self.max_bytes = max_bytes
+        self.quality = quality
+        self.metadata = metadata
+        self.rules = dict(rules or {})
+        self.pre = seconds if pre is None else min(pre, seconds)
+        self.post = post
+        self.format = fmt
+        self.name = name
+        self.history = history
+        self.bytes = 0
+        self.recorded = 0
+        self.evicted = 0
+        self.errors = 0             # 编码、元数据或触发规则出错的次数
+        self._last_error = None
+        self._frames = deque()
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._events = OrderedDict()
+        self._pending = []          # 还在等待触发后画面的事件
+        self._rule_times = {}       # 类别名 -> 上次自动触发的时刻
+        self._flush_queue = queue.Queue()
+        self._running = True
+        self._thread = threading.Thread(target=self._record, name='event-recorder', daemon=True)
+        self._thread.start()
+        self._writer = threading.Thread(target=self._flush, name='event-writer', daemon=True)
+        self._writer.start()
+
+    def stop(self):
+        self._running = False
+        self._thread.join(timeout=2.0)
+
+    def trigger(self, reason='manual', pre=None, post=None, fmt=None):
+        """
+        触发一次事件，立即返回 RecordingEvent
+
+        缓冲区中触发前 pre 秒的帧立即可用，再等 post 秒的帧录完后由后台线程写到磁盘
+        """
+        pre = self.pre if pre is None else min(max(pre, 0.0), self.seconds)
+        post = self.post if post is None else max(post, 0.0)
+        fmt = fmt or self.format
+        if fmt not in ('video', 'frames'):
+            raise ValueError("不支持的保存格式: {}".format(fmt))
+        event = RecordingEvent(next(self._ids), reason, time.monotonic(), pre, post, fmt)
+        with self._lock:
+            self._events[event.id] = event
+            while len(self._events) > self.history:
+                self._events.popitem(last=False)
+            self._pending.append(event)
+        return event
+
+    def get(self, event_id):
+        with self._lock:
+            event = self._events.get(event_id)
+            return event.as_dict() if event is not None else None
+
+    def stats(self):
+        with self._lock:
+            frames = len(self._frames)
+            span = self._frames[-1].timestamp - self._frames[0].timestamp if frames > 1 else 0.0
+            return {
+                'frames': frames,
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'seconds': span,
+                'recorded': self.recorded,
+                'evicted': self.evicted,
+                'errors': self.errors,
+                'rules': self.rules,
+                'events': [event.as_dict() for event in self._events.values()],
+            }
+
+    def _append(self, frame):
+        with self._lock:
+            self._frames.append(frame)
+            self.bytes += len(frame.data)
+            self.recorded += 1
+            # 超出时长或字节数上限时丢弃最旧的帧
+            oldest = frame.timestamp - self.seconds
+            while self._frames and (self._frames[0].timestamp < oldest or self.bytes > self.max_bytes):
+                self.bytes -= len(self._frames.popleft().data)
+                self.evicted += 1
+
+    def _apply_rules(self, metadata, now):
+        if not self.rules or not metadata:
+            return
+        for label in set(metadata.get('labels') or ()):
+            cooldown = self.rules.get(label)
+            if cooldown is None:
+                continue
+            last = self._rule_times.get(label)
+            if last is None or now - last >= cooldown:
+                self._rule_times[label] = now
+                self.trigger(reason='class:{}'.format(label))
+
+    def _release_ready(self, now):
+        """把触发后画面已经录完的事件交给写入线程"""
+        with self._lock:
+            ready = [event for event in self._pending if event.end <= now]
+            if not ready:
+                return
+            self._pending = [event for event in self._pending if event.end > now]
+            # 只复制帧对象的引用，JPEG数据不复制
+            batches = [(event, [f for f in self._frames if event.start <= f.timestamp <= event.end])
+                       for event in ready]
+        for event, frames in batches:
+            event.state = 'writing'
+            self._flush_queue.put((event, frames))
+
+    def _record(self):
+        period = 1.0 / self.fps
+        deadline = time.monotonic()
+        seq = 0
+        while self._running:
+            deadline += period
+            new_seq, frame = self.camera.wait_frame(seq, timeout=1.0)
+            now = time.monotonic()
+            try:
+                if frame is not None:
+                    seq = new_seq
+                    ok, jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+                    metadata = self.metadata(seq) if self.metadata is not None else None
+                    if ok:
+                        self._append(RecordedFrame(seq, now, jpeg.tobytes(), metadata))
+                    self._apply_rules(metadata, now)
+                self._release_ready(now)
+            except Exception as e:
+                # 录像线程退出后缓冲区不再更新，之后的事件都会录空，因此只跳过这一帧；同样的错误只打印一次
+                self.errors += 1
+                if str(e) != self._last_error:
+                    self._last_error = str(e)
+                    print(f"事件录像出错，跳过该帧: {e}")
+            # 跟不上时不补帧，从当前时刻重新计时
+            delay = deadline - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                deadline = time.monotonic()
+
+    def _flush(self):
+        while True:
+            event, frames = self._flush_queue.get()
+            try:
+                self._write(event, frames)
+                event.state = 'done'
+            except Exception as e:
+                print(f"保存事件录像时出错: {e}")
+                event.state = 'failed'
+                event.error = str(e)
+            event.finished = time.time()
+
+    def _write(self, event, frames):
+        if not frames:
+            raise RuntimeError("缓冲区中没有该时间段的帧")
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self.directory, "event_{}_{}_{}".format(self.name, stamp, event.id))
+        os.makedirs(path, exist_ok=True)
+        event.path = path
+        event.frames = len(frames)
+
+        if event.format == 'frames':
+            for i, f in enumerate(frames):
+                with open(os.path.join(path, "{:05d}.jpg".format(i)), 'wb') as out:
+                    out.write(f.data)
+        else:
+            # 按缓冲区中帧的实际时间戳计算帧率，视频源跟不上 self.fps 时回放速度仍然正确
+            span = frames[-1].timestamp - frames[0].timestamp
+            fps = (len(frames) - 1) / span if len(frames) > 1 and span > 0 else self.fps
+            writer = None
+            try:
+                for f in frames:
+                    image = cv2.imdecode(np.frombuffer(f.data, dtype=np.uint8), cv2.IMREAD_COLOR)
+                    if writer is None:
+                        h, w = image.shape[:2]
+                        writer = cv2.VideoWriter(os.path.join(path, 'clip.mp4'), cv2.VideoWriter_fourcc(*'mp4v'),
+                                                 fps, (w, h))
+                        if not writer.isOpened():
+                            raise RuntimeError("无法创建视频文件")
+                    elif image.shape[:2] != (h, w):
+                        # 视频源重连后分辨率可能变化，视频中每一帧尺寸必须相同
+                        image = cv2.resize(image, (w, h))
+                    writer.write(image)
+            finally:
+                if writer is not None:
+                    writer.release()
+
+        with open(os.path.join(path, 'metadata.json'), 'w') as out:
+            json.dump({
+                'event': event.as_dict(),
+                'frames': [{'index': i, 'seq': f.seq, 'offset': f.timestamp - event.triggered,
+                            'detections': f.metadata} for i, f in enumerate(frames)],
+            }, out, ensure_ascii=False, indent=1)
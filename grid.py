@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+栅格地图预处理
+将嵌套列表或NumPy数组形式的地图一次性转换为规划器使用的格式：
+按小车尺寸膨胀障碍物、生成带边框的一维可通行数组以及邻居偏移量
+
+地图变化时通过 Grid.update / Grid.set_map 修改，版本号和指纹随之更新，
+并通知订阅者（路径缓存、增量规划器等）。
+"""
+
+import hashlib
+import math
+
+import numpy as np
+
+# 四邻域方向，与dfs.py中的顺序保持一致
+DIRECTIONS = ((0, 1), (1, 0), (0, -1), (-1, 0))
+
+
+def footprint_radius(car_width, car_length, resolution):
+    """
+    根据小车尺寸计算障碍物膨胀半径(格子数)
+
+    参数:
+        car_width, car_length: 小车宽度和长度(米)
+        resolution: 每个格子的边长(米)
+    """
+    half_diagonal = math.hypot(car_width, car_length) / 2.0
+    return int(math.ceil(half_diagonal / resolution))
+
+
+def inflate(obstacles, radius):
+    """
+    将障碍物按圆形区域膨胀 radius 个格子
+
+    通过对圆盘内每个偏移量做一次整块数组的平移和按位或实现，
+    不逐格遍历地图。
+
+    参数:
+        obstacles: 布尔数组，True表示障碍物
+        radius: 膨胀半径(格子数)
+    """
+    obstacles = np.asarray(obstacles, dtype=bool)
+    if radius <= 0:
+        return obstacles.copy()
+
+    rows, cols = obstacles.shape
+    padded = np.zeros((rows + 2 * radius, cols + 2 * radius), dtype=bool)
+    for dx in range(-radius, radius + 1):
+        for dy in range(-radius, radius + 1):
+            if dx * dx + dy * dy > radius * radius:
+                continue
+            padded[radius + dx:radius + dx + rows, radius + dy:radius + dy + cols] |= obstacles
+    return padded[radius:radius + rows, radius:radius + cols]
+
+
+class Grid:
+    """
+    规划器使用的栅格地图
+
+    属性:
+        obstacles: 膨胀后的障碍物布尔数组，形状为 (rows, cols)
+        free: 带一圈障碍物边框的一维可通行数组(bytearray)，1表示可通行
+        stride: 一维数组中每行的长度 (cols + 2)
+        offsets: 四邻域方向对应的一维下标偏移量
+        cache: 依赖于地图内容的预计算结果（跳跃表、分层抽象图等），地图修改时清空
+        version: 地图版本号，每次修改加1
+    """
+
+    def __init__(self, matrix, inflate_radius=0):
+        if matrix is None:
+            raise ValueError("地图为空")
+        raw = np.asarray(matrix)
+        if raw.ndim != 2:
+            raise ValueError("地图必须是二维矩阵")
+
+        self.raw = raw != 0
+        self.inflate_radius = inflate_radius
+        self.rows, self.cols = raw.shape
+        self.stride = self.cols + 2
+        self.offsets = tuple(dx * self.stride + dy for dx, dy in DIRECTIONS)
+        self.version = 0
+        self._listeners = []
+        self._build()
+
+    def _build(self, obstacles=None):
+        self.obstacles = inflate(self.raw, self.inflate_radius) if obstacles is None else obstacles
+        padded = np.zeros((self.rows + 2, self.stride), dtype=np.uint8)
+        padded[1:-1, 1:-1] = ~self.obstacles
+        self.free = bytearray(padded.tobytes())
+        self.cache = {}
+        self._fingerprint = None
+
+    @property
+    def fingerprint(self):
+        """地图内容(膨胀后)的哈希值，内容相同的两张地图指纹相同"""
+        if self._fingerprint is None:
+            digest = hashlib.blake2b(digest_size=16)
+            digest.update(np.array(self.obstacles.shape, dtype=np.int64).tobytes())
+            digest.update(np.packbits(self.obstacles).tobytes())
+            self._fingerprint = digest.hexdigest()
+        return self._fingerprint
+
+    def subscribe(self, listener):
+        """
+        订阅地图修改事件
+
+        参数:
+            listener: 回调函数 listener(grid, old_fingerprint, changed)，
+                      changed 为可通行状态发生变化的格子列表 [(x, y), ...]
+        """
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _changed(self, old_fingerprint, changed):
+        self.version += 1
+        self.cache = {}
+        self._fingerprint = None
+        for listener in list(self._listeners):
+            listener(self, old_fingerprint, changed)
+
+    def update(self, cells, blocked=True):
+        """
+        将若干格子标记为障碍物或通道
+
+        只重新计算受影响区域的障碍物膨胀，不重建整张地图。
+
+        参数:
+            cells: 格子坐标列表 [(x, y), ...]
+            blocked: True表示设为障碍物，False表示设为通道
+
+        返回:
+            可通行状态发生变化的格子列表
+        """
+        cells = [(x, y) for x, y in cells if self.inside(x, y)]
+        if not cells:
+            return []
+        old_fingerprint = self._fingerprint
+        xs = np.array([c[0] for c in cells])
+        ys = np.array([c[1] for c in cells])
+        self.raw[xs, ys] = blocked
+
+        # 膨胀后受影响的区域，以及计算该区域需要读取的原始地图范围
+        r = self.inflate_radius
+        x0, x1 = max(xs.min() - r, 0), min(xs.max() + r + 1, self.rows)
+        y0, y1 = max(ys.min() - r, 0), min(ys.max() + r + 1, self.cols)
+        ax0, ax1 = max(x0 - r, 0), min(x1 + r, self.rows)
+        ay0, ay1 = max(y0 - r, 0), min(y1 + r, self.cols)
+        window = inflate(self.raw[ax0:ax1, ay0:ay1], r)[x0 - ax0:x1 - ax0, y0 - ay0:y1 - ay0]
+
+        diff = np.argwhere(window != self.obstacles[x0:x1, y0:y1])
+        if len(diff) == 0:
+            return []
+        self.obstacles[x0:x1, y0:y1] = window
+        passable = (~window).astype(np.uint8)
+        for i in range(x1 - x0):
+            start = self.index(x0 + i, y0)
+            self.free[start:start + (y1 - y0)] = passable[i].tobytes()
+
+        changed = [(int(dx) + x0, int(dy) + y0) for dx, dy in diff]
+        self._changed(old_fingerprint, changed)
+        return changed
+
+    def set_map(self, matrix):
+        """用新的地图整体替换当前地图（尺寸必须相同）"""
+        raw = np.asarray(matrix) != 0
+        if raw.shape != (self.rows, self.cols):
+            raise ValueError("地图尺寸不一致: {} != {}".format(raw.shape, (self.rows, self.cols)))
+        self.raw = raw
+        obstacles = inflate(raw, self.inflate_radius)
+        changed = [(int(x), int(y)) for x, y in np.argwhere(obstacles != self.obstacles)]
+        if changed:
+            old_fingerprint = self._fingerprint
+            self._build(obstacles)
+            self._changed(old_fingerprint, changed)
+        return changed
+
+    @property
+    def shape(self):
+        return self.rows, self.cols
+
+    def inside(self, x, y):
+        return 0 <= x < self.rows and 0 <= y < self.cols
+
+    def index(self, x, y):
+        """坐标转换为一维下标"""
+        return (x + 1) * self.stride + y + 1
+
+    def coords(self, idx):
+        """一维下标转换为坐标"""
+        x, y = divmod(idx, self.stride)
+        return x - 1, y - 1
+
+    def is_free(self, x, y):
+        return self.inside(x, y) and self.free[self.index(x, y)] == 1
+
+
+def as_grid(matrix, inflate_radius=0):
+    """将地图转换为Grid，已经是Grid时直接返回"""
+    if isinstance(matrix, Grid):
+        return matrix
+    return Grid(matrix, inflate_radius)
@@ -0,0 +1,341 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+分层路径规划 (HPA*)
+
+将地图划分为 cluster_size x cluster_size 的区块，在相邻区块的公共边界上放置入口节点，
+并预先计算每个区块内入口之间的距离，得到一张很小的抽象图。
+查询时先在抽象图上搜索，再在经过的区块内细化出逐格路径。
+
+抽象图每张地图只构建一次，缓存在 Grid.cache 中。得到的路径接近最短路径，但不保证最短。
+"""
+
+import heapq
+import time
+
+import numpy as np
+
+from grid import Grid
+from planner import plan
+
+_CACHE_KEY = 'hpa'
+
+# 入口区段长度达到该值时，在区段两端各放一个入口，否则只在中间放一个
+LONG_ENTRANCE = 6
+
+
+def _row_bits(passable, k):
+    """
+    将地图按 k x k 区块切分，并把每个区块的每一行压缩成一个 uint64 位串
+
+    返回:
+        形状为 (区块行数, 区块列数, k) 的数组，地图边缘不足 k 的部分按障碍物处理
+    """
+    rows, cols = passable.shape
+    rc, cc = -(-rows // k), -(-cols // k)
+    padded = np.zeros((rc * k, cc * k), dtype=np.uint64)
+    padded[:rows, :cols] = passable
+    blocks = padded.reshape(rc, k, cc, k).transpose(0, 2, 1, 3)
+    return (blocks << np.arange(k, dtype=np.uint64)).sum(axis=3, dtype=np.uint64)
+
+
+def _bit_bfs(masks, src_x, src_y, pair_src, pair_x, pair_y):
+    """
+    按位并行的区块内广度优先搜索，同时处理多个起点（可以属于不同区块）
+
+    每个起点的搜索前沿用 k 个 uint64 表示，左右扩展是移位，上下扩展是错行，
+    每一轮只需要对整块数组做几次位运算。
+
+    参数:
+        masks: (m, k) 每个起点所在区块的可通行位串
+        src_x, src_y: 起点的区块内坐标
+        pair_src, pair_x, pair_y: 需要求距离的点对（起点序号，终点的区块内坐标）
+
+    返回:
+        每个点对的距离，不可达为 -1
+    """
+    one = np.uint64(1)
+    frontier = np.zeros(masks.shape, dtype=np.uint64)
+    frontier[np.arange(len(masks)), src_x] = one << src_y.astype(np.uint64)
+    visited = frontier.copy()
+    # 原始起点序号 -> 压缩后数组中的行号，-1 表示该起点已经搜索完毕
+    row_of = np.arange(len(masks))
+
+    target = one << pair_y.astype(np.uint64)
+    dist = np.full(len(pair_src), -1, dtype=np.int64)
+    # 曼哈顿距离是BFS距离的下界，点对只在前沿推进到下界之后才需要检查
+    bound = np.abs(src_x[pair_src] - pair_x) + np.abs(src_y[pair_src] - pair_y)
+    order = np.argsort(bound, kind='stable')
+    bound = bound[order]
+    dist[order[bound == 0]] = 0
+    cursor = np.searchsorted(bound, 0, side='right')
+    active = np.empty(0, dtype=np.int64)
+
+    d = 0
+    while (cursor < len(order) or len(active)) and frontier.any():
+        d += 1
+        spread = frontier | (frontier << one) | (frontier >> one)
+        spread[:, 1:] |= frontier[:, :-1]
+        spread[:, :-1] |= frontier[:, 1:]
+        frontier = spread & masks & ~visited
+        visited |= frontier
+
+        end = np.searchsorted(bound, d, side='right')
+        if end > cursor:
+            fresh = order[cursor:end]
+            active = np.concatenate((active, fresh[row_of[pair_src[fresh]] >= 0]))
+            cursor = end
+        rows = row_of[pair_src[active]]
+        hit = (visited[rows, pair_x[active]] & target[active]) != 0
+        dist[active[hit]] = d
+        active = active[~hit]
+
+        if d % 8 == 0:
+            # 定期丢弃前沿已经为空（连通区域已搜完）或点对都已求出的起点，缩小后续位运算的数组
+            needed = np.zeros(len(row_of), dtype=bool)
+            needed[pair_src[active]] = True
+            needed[pair_src[order[cursor:]]] = True
+            alive = row_of >= 0
+            keep_rows = np.zeros(len(frontier), dtype=bool)
+            keep_rows[row_of[alive]] = needed[alive]
+            keep_rows &= frontier.any(axis=1)
+            if keep_rows.sum() * 4 < len(keep_rows) * 3:
+                new_row = np.cumsum(keep_rows) - 1
+                new_row[~keep_rows] = -1
+                row_of[alive] = new_row[row_of[alive]]
+                frontier, visited, masks = frontier[keep_rows], visited[keep_rows], masks[keep_rows]
+                active = active[row_of[pair_src[active]] >= 0]
+    return dist
+
+
+class HierarchicalPlanner:
+    """
+    基于区块抽象图的分层路径规划器
+
+    参数:
+        grid: grid.Grid 地图
+        cluster_size: 区块边长(格子数)，不超过64（区块的每一行用一个uint64位串表示）
+    """
+
+    def __init__(self, grid, cluster_size=32):
+        if not 0 < cluster_size <= 64:
+            raise ValueError("区块边长必须在1到64之间")
+        t0 = time.perf_counter()
+        self.grid = grid
+        self.cluster_size = cluster_size
+        self.passable = ~grid.obstacles
+        self.bits = _row_bits(self.passable, cluster_size)
+        self.edges = {}             # 抽象节点下标 -> [(邻居下标, 代价), ...]
+        self.cluster_nodes = {}     # 区块 -> [抽象节点下标, ...]
+        self._local_grids = {}
+        self._segments = {}         # 已细化过的区块内路径段，重复查询时直接复用
+
+        self._build_entrances()
+        self._build_intra_edges()
+        self.build_time = time.perf_counter() - t0
+
+    def cluster_of(self, x, y):
+        return x // self.cluster_size, y // self.cluster_size
+
+    def cluster_bounds(self, cluster):
+        k = self.cluster_size
+        r0, c0 = cluster[0] * k, cluster[1] * k
+        return r0, min(r0 + k, self.grid.rows), c0, min(c0 + k, self.grid.cols)
+
+    def _add_node(self, x, y):
+        idx = self.grid.index(x, y)
+        if idx not in self.edges:
+            self.edges[idx] = []
+            self.cluster_nodes.setdefault(self.cluster_of(x, y), []).append(idx)
+        return idx
+
+    def _add_transitions(self, side_a, side_b, cells_a, cells_b):
+        """在两侧都可通行的连续区段上放置入口节点对"""
+        both = np.concatenate(([False], side_a & side_b, [False]))
+        changes = np.flatnonzero(both[1:] != both[:-1])
+        for begin, end in zip(changes[::2], changes[1::2]):
+            if end - begin >= LONG_ENTRANCE:
+                picks = (begin, end - 1)
+            else:
+                picks = ((begin + end - 1) // 2,)
+            for i in picks:
+                a = self._add_node(*cells_a(i))
+                b = self._add_node(*cells_b(i))
+                self.edges[a].append((b, 1))
+                self.edges[b].append((a, 1))
+
+    def _build_entrances(self):
+        k = self.cluster_size
+        rows, cols = self.grid.rows, self.grid.cols
+        passable = self.passable
+
+        for r0 in range(0, rows, k):
+            r1 = min(r0 + k, rows)
+            for c in range(k, cols, k):
+                self._add_transitions(passable[r0:r1, c - 1], passable[r0:r1, c],
+                                      lambda i: (r0 + i, c - 1), lambda i: (r0 + i, c))
+        for c0 in range(0, cols, k):
+            c1 = min(c0 + k, cols)
+            for r in range(k, rows, k):
+                self._add_transitions(passable[r - 1, c0:c1], passable[r, c0:c1],
+                                      lambda i: (r - 1, c0 + i), lambda i: (r, c0 + i))
+
+    def _local_coords(self, cluster, nodes):
+        r0, _, c0, _ = self.cluster_bounds(cluster)
+        coords = [self.grid.coords(n) for n in nodes]
+        return [(x - r0, y - c0) for x, y in coords]
+
+    def _build_intra_edges(self):
+        """所有区块的入口节点两两求区块内距离，一次批量的按位BFS完成"""
+        src_cluster, src_x, src_y = [], [], []
+        pair_src, pair_x, pair_y, pair_nodes = [], [], [], []
+
+        for cluster, nodes in self.cluster_nodes.items():
+            if len(nodes) < 2:
+                continue
+            local = self._local_coords(cluster, nodes)
+            base = len(src_x)
+            for x, y in local:
+                src_cluster.append(cluster)
+                src_x.append(x)
+                src_y.append(y)
+            for i, a in enumerate(nodes):
+                for j, b in enumerate(nodes):
+                    if i != j:
+                        pair_src.append(base + i)
+                        pair_x.append(local[j][0])
+                        pair_y.append(local[j][1])
+                        pair_nodes.append((a, b))
+
+        if not pair_src:
+            return
+        clusters = np.array(src_cluster)
+        masks = self.bits[clusters[:, 0], clusters[:, 1]]
+        dist = _bit_bfs(masks, np.array(src_x), np.array(src_y),
+                        np.array(pair_src), np.array(pair_x), np.array(pair_y))
+        for (a, b), d in zip(pair_nodes, dist.tolist()):
+            if d > 0:
+                self.edges[a].append((b, d))
+
+    def _connect(self, idx, cluster):
+        """计算临时节点(起点/终点)到所在区块入口节点的距离"""
+        nodes = self.cluster_nodes.get(cluster, [])
+        if not nodes:
+            return []
+        (sx, sy), = self._local_coords(cluster, [idx])
+        targets = self._local_coords(cluster, nodes)
+        masks = self.bits[cluster[0], cluster[1]][None, :]
+        dist = _bit_bfs(masks, np.array([sx]), np.array([sy]), np.zeros(len(nodes), dtype=np.int64),
+                        np.array([t[0] for t in targets]), np.array([t[1] for t in targets]))
+        return [(n, d) for n, d in zip(nodes, dist.tolist()) if d >= 0]
+
+    def _local_path(self, cluster, a, b):
+        """在单个区块内细化两点之间的逐格路径"""
+        segment = self._segments.get((a, b))
+        if segment is not None:
+            return segment, 0
+        r0, r1, c0, c1 = self.cluster_bounds(cluster)
+        local_grid = self._local_grids.get(cluster)
+        if local_grid is None:
+            local_grid = Grid(~self.passable[r0:r1, c0:c1])
+            self._local_grids[cluster] = local_grid
+        ax, ay = self.grid.coords(a)
+        bx, by = self.grid.coords(b)
+        result = plan(local_grid, ax - r0, ay - c0, bx - r0, by - c0, 'astar')
+        segment = [[x + r0, y + c0] for x, y in result.path]
+        if a in self.edges and b in self.edges:
+            # 只缓存入口节点之间的路径段，起点/终点每次查询都不同
+            self._segments[(a, b)] = segment
+        return segment, result.expansions
+
+    def search(self, start, goal):
+        """
+        在抽象图上搜索并细化路径
+
+        返回:
+            (path, expansions)，expansions 为抽象图与区块内细化扩展节点数之和
+        """
+        grid = self.grid
+        start_cluster = self.cluster_of(*grid.coords(start))
+        goal_cluster = self.cluster_of(*grid.coords(goal))
+        expansions = 0
+
+        if start_cluster == goal_cluster:
+            path, expansions = self._local_path(start_cluster, start, goal)
+            if path:
+                return path, expansions
+
+        start_edges = self._connect(start, start_cluster)
+        goal_edges = dict(self._connect(goal, goal_cluster))
+
+        stride = grid.stride
+        gx, gy = divmod(goal, stride)
+
+        def heuristic(idx):
+            x, y = divmod(idx, stride)
+            return abs(x - gx) + abs(y - gy)
+
+        g = {start: 0}
+        parent = {start: -1}
+        closed = set()
+        h0 = heuristic(start)
+        heap = [(h0, h0, start)]
+        found = False
+
+        while heap:
+            _, _, cur = heapq.heappop(heap)
+            if cur in closed:
+                continue
+            closed.add(cur)
+            expansions += 1
+            if cur == goal:
+                found = True
+                break
+
+            neighbors = list(self.edges.get(cur, ()))
+            if cur == start:
+                neighbors.extend(start_edges)
+            if cur in goal_edges:
+                neighbors.append((goal, goal_edges[cur]))
+
+            for nxt, cost in neighbors:
+                new_g = g[cur] + cost
+                if nxt not in closed and new_g < g.get(nxt, float('inf')):
+                    g[nxt] = new_g
+                    parent[nxt] = cur
+                    h = heuristic(nxt)
+                    heapq.heappush(heap, (new_g + h, h, nxt))
+
+        if not found:
+            return [], expansions
+
+        abstract = []
+        node = goal
+        while node != -1:
+            abstract.append(node)
+            node = parent[node]
+        abstract.reverse()
+
+        path = [list(grid.coords(start))]
+        for a, b in zip(abstract, abstract[1:]):
+            if a == b:
+                continue
+            cluster_a = self.cluster_of(*grid.coords(a))
+            if cluster_a != self.cluster_of(*grid.coords(b)):
+                # 跨区块的入口边，两点相邻
+                path.append(list(grid.coords(b)))
+                continue
+            segment, local_expansions = self._local_path(cluster_a, a, b)
+            expansions += local_expansions
+            path.extend(segment[1:])
+        return path, expansions
+
+
+def hierarchy(grid, cluster_size=32):
+    """获取（必要时构建）地图的分层抽象图"""
+    planner = grid.cache.get(_CACHE_KEY)
+    if planner is None or planner.cluster_size != cluster_size:
+        planner = HierarchicalPlanner(grid, cluster_size)
+        grid.cache[_CACHE_KEY] = planner
+    return planner
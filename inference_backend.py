@@ -0,0 +1,324 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+目标检测推理后端
+统一的检测接口，可以在以下后端之间通过配置切换：
+  torch       - ultralytics + PyTorch（原来的方式，有GPU时使用GPU）
+  onnxruntime - 导出为固定输入尺寸的ONNX模型，用ONNX Runtime推理（可选INT8动态量化）
+  openvino    - 导出为OpenVINO IR模型，在Intel CPU上推理（可选INT8量化）
+
+模型只在第一次使用时导出一次，之后直接加载导出的文件，推理会话在后端对象中缓存。
+所有后端的 predict(frames) 都返回每一帧的 (boxes, classes, scores)，boxes 为原图上的 xyxy 像素坐标。
+
+前处理不使用 ultralytics 的内部流程：letterbox 直接缩放到预先分配的画布中，BGR→RGB、HWC→CHW 和归一化
+写入预先分配的输入张量，每帧不再分配新的图像和张量（torch 后端通过 torch.from_numpy 共享同一块内存）。
+"""
+
+import ast
+import os
+import threading
+
+import cv2
+import numpy as np
+
+# 默认配置，server.py 中的 inference_config 会覆盖这些值
+DEFAULT_CONFIG = {
+    'backend': 'torch',         # torch / onnxruntime / openvino
+    'weights': 'yolo11n.pt',
+    'imgsz': 640,               # 导出模型的固定输入尺寸
+    'batch': 1,                 # 导出模型的固定批大小，帧数不足时补零
+    'max_batch': 8,             # torch 后端输入尺寸不固定，一次最多处理的帧数
+    'int8': False,              # 导出时是否做INT8量化
+    'conf': 0.25,
+    'iou': 0.45,
+    'device': None,             # torch 后端使用的设备，None 时自动选择
+}
+
+
+class Backend:
+    """推理后端的公共部分：前处理（letterbox）和YOLO输出的后处理"""
+
+    name = None
+    dynamic_batch = False           # 模型是否接受任意批大小
+
+    def __init__(self, config):
+        self.config = config
+        self.imgsz = config['imgsz']
+        self.batch = max(1, config['max_batch'] if self.dynamic_batch else config['batch'])
+        self.conf = config['conf']
+        self.iou = config['iou']
+        self.names = {}
+        self.source = None          # 实际加载的模型文件
+        # 预先分配的缓冲区：输入张量、每个批位置一块letterbox画布，以及各输入尺寸对应的缩放参数
+        self._blob = self._allocate_blob((self.batch, 3, self.imgsz, self.imgsz))
+        self._canvases = [np.full((self.imgsz, self.imgsz, 3), 114, dtype=np.uint8) for _ in range(self.batch)]
+        self._canvas_shapes = [None] * self.batch
+        self._geometry = {}
+        # 输入张量和画布在各次调用之间共享，多个线程同时调用 predict 时需要串行执行
+        self._lock = threading.Lock()
+
+    def _allocate_blob(self, shape):
+        return np.zeros(shape, dtype=np.float32)
+
+    def __call__(self, frames):
+        return self.predict(frames)
+
+    def predict(self, frames):
+        """
+        检测一批BGR图像，线程安全
+
+        返回:
+            与 frames 等长的列表，每个元素为 (boxes (N, 4) float32, classes (N,) int32, scores (N,) float32)
+        """
+        results = []
+        with self._lock:
+            for start in range(0, len(frames), self.batch):
+                chunk = frames[start:start + self.batch]
+                blob, transforms = self._preprocess(chunk)
+                outputs = self._infer(blob, len(chunk))
+                for i, transform in enumerate(transforms):
+                    results.append(self._postprocess(outputs[i], transform))
+        return results
+
+    def _infer(self, blob, count):
+        """对输入张量推理，count 为其中有效的帧数，返回 (batch, 4 + 类别数, 候选框数) 的输出"""
+        raise NotImplementedError
+
+    def _letterbox_geometry(self, h, w):
+        """输入尺寸对应的缩放比例和填充，同一路摄像头的尺寸不变，只计算一次"""
+        geometry = self._geometry.get((h, w))
+        if geometry is None:
+            size = self.imgsz
+            ratio = min(size / h, size / w)
+            new_w, new_h = int(round(w * ratio)), int(round(h * ratio))
+            geometry = (ratio, new_w, new_h, (size - new_w) // 2, (size - new_h) // 2)
+            self._geometry[(h, w)] = geometry
+        return geometry
+
+    def _preprocess(self, frames):
+        """
+        letterbox 到固定尺寸，写入 (batch, 3, imgsz, imgsz) 的 float32 RGB 输入张量
+
+        返回的张量是预先分配的缓冲区，下一次调用时会被覆盖。
+        """
+        blob = self._blob
+        transforms = []
+        for i, frame in enumerate(frames):
+            h, w = frame.shape[:2]
+            ratio, new_w, new_h, pad_x, pad_y = self._letterbox_geometry(h, w)
+            canvas = self._canvases[i]
+            if self._canvas_shapes[i] != (h, w):
+                # 输入尺寸变化时重新填充边框，尺寸不变时边框保持不变，只覆盖中间的图像区域
+                canvas.fill(114)
+                self._canvas_shapes[i] = (h, w)
+            cv2.resize(frame, (new_w, new_h), dst=canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w],
+                       interpolation=cv2.INTER_LINEAR)
+            # BGR→RGB、HWC→CHW 和归一化一步写入输入张量，不产生中间数组
+            for c in range(3):
+                np.multiply(canvas[:, :, 2 - c], 1.0 / 255.0, out=blob[i, c], casting='unsafe')
+            transforms.append((ratio, pad_x, pad_y, w, h))
+        # 固定批大小的模型，批中空余的位置清零，避免上一批的图像产生多余的检测
+        if len(frames) < self.batch and not self.dynamic_batch:
+            blob[len(frames):] = 0
+        return blob, transforms
+
+    def _postprocess(self, output, transform):
+        """YOLOv8/YOLO11 的输出 (4 + 类别数, 候选框数) 转换为原图坐标的检测结果，并做按类别的NMS"""
+        ratio, pad_x, pad_y, w, h = transform
+        # 先按最高类别分数筛选候选框，之后只处理少量候选框
+        scores = output[4:].max(axis=0)
+        keep = np.flatnonzero(scores > self.conf)
+        pred = output[:, keep].T
+        scores = scores[keep]
+        classes = pred[:, 4:].argmax(axis=1)
+        if not len(pred):
+            return np.zeros((0, 4), np.float32), np.zeros(0, np.int32), np.zeros(0, np.float32)
+
+        boxes = np.empty((len(pred), 4), dtype=np.float32)
+        boxes[:, 0] = pred[:, 0] - pred[:, 2] / 2
+        boxes[:, 1] = pred[:, 1] - pred[:, 3] / 2
+        boxes[:, 2] = pred[:, 0] + pred[:, 2] / 2
+        boxes[:, 3] = pred[:, 1] + pred[:, 3] / 2
+
+        # 不同类别的框加上不同的偏移，一次NMS即可实现按类别抑制
+        offset = classes[:, None].astype(np.float32) * (self.imgsz * 2)
+        nms_boxes = boxes + offset
+        xywh = np.concatenate([nms_boxes[:, :2], nms_boxes[:, 2:] - nms_boxes[:, :2]], axis=1)
+        indices = cv2.dnn.NMSBoxes(xywh.tolist(), scores.tolist(), self.conf, self.iou)
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+
+        boxes = boxes[indices]
+        boxes[:, [0, 2]] = ((boxes[:, [0, 2]] - pad_x) / ratio).clip(0, w)
+        boxes[:, [1, 3]] = ((boxes[:, [1, 3]] - pad_y) / ratio).clip(0, h)
+        return boxes, classes[indices].astype(np.int32), scores[indices].astype(np.float32)
+
+    def ultralytics(self):
+        """返回加载同一个模型文件的 ultralytics.YOLO 对象，用于离线视频检测等需要完整 ultralytics 功能的场景"""
+        from ultralytics import YOLO
+        return YOLO(self.source)
+
+
+class TorchBackend(Backend):
+    """
+    ultralytics 模型的 PyTorch 网络，直接输入预处理好的张量
+
+    输入张量由 torch.from_numpy 与预分配的 NumPy 缓冲区共享内存；使用GPU时缓冲区分配在锁页内存中，
+    可以异步拷贝到显存。
+    """
+
+    name = 'torch'
+    dynamic_batch = True
+
+    def __init__(self, config):
+        import torch
+        from ultralytics import YOLO
+        self.torch = torch
+        self.device = torch.device(config['device'] or ('cuda' if torch.cuda.is_available() else 'cpu'))
+        super(TorchBackend, self).__init__(config)
+        self.source = config['weights']
+        self.model = YOLO(self.source)
+        self.names = dict(self.model.names)
+        self.model.fuse()
+        self.net = self.model.model.to(self.device).eval()
+        self._tensor = torch.from_numpy(self._blob)
+
+    def _allocate_blob(self, shape):
+        torch = self.torch
+        if self.device.type == 'cuda':
+            return torch.zeros(shape, dtype=torch.float32).pin_memory().numpy()
+        return super(TorchBackend, self)._allocate_blob(shape)
+
+    def _infer(self, blob, count):
+        torch = self.torch
+        with torch.inference_mode():
+            preds = self.net(self._tensor[:count].to(self.device, non_blocking=True))
+        if isinstance(preds, (list, tuple)):
+            preds = preds[0]
+        return preds.float().cpu().numpy()
+
+    def ultralytics(self):
+        return self.model
+
+
+class OnnxRuntimeBackend(Backend):
+    """固定输入尺寸的ONNX模型 + ONNX Runtime"""
+
+    name = 'onnxruntime'
+
+    def __init__(self, config):
+        super(OnnxRuntimeBackend, self).__init__(config)
+        import onnxruntime as ort
+        self.source = export_model(config['weights'], 'onnx', self.imgsz, self.batch, config['int8'])
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(self.source, options, providers=ort.get_available_providers())
+        self.input_name = self.session.get_inputs()[0].name
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.names = _parse_names(metadata.get('names'))
+
+    def _infer(self, blob, count):
+        return self.session.run(None, {self.input_name: blob})[0]
+
+
+class OpenVinoBackend(Backend):
+    """OpenVINO IR模型，编译一次后缓存"""
+
+    name = 'openvino'
+
+    def __init__(self, config):
+        super(OpenVinoBackend, self).__init__(config)
+        import openvino as ov
+        export_dir = export_model(config['weights'], 'openvino', self.imgsz, self.batch, config['int8'])
+        self.source = export_dir
+        xml = [f for f in os.listdir(export_dir) if f.endswith('.xml')][0]
+        core = ov.Core()
+        model = core.read_model(os.path.join(export_dir, xml))
+        self.compiled = core.compile_model(model, config['device'] or 'CPU',
+                                           {'PERFORMANCE_HINT': 'LATENCY'})
+        self.request = self.compiled.create_infer_request()
+        self.names = _read_openvino_names(export_dir)
+
+    def _infer(self, blob, count):
+        self.request.infer({0: blob})
+        return self.request.get_output_tensor(0).data
+
+
+BACKENDS = {
+    'torch': TorchBackend,
+    'onnxruntime': OnnxRuntimeBackend,
+    'openvino': OpenVinoBackend,
+}
+
+
+def export_model(weights, fmt, imgsz=640, batch=1, int8=False):
+    """
+    把 .pt 模型导出为 onnx / openvino 格式，已经导出过时直接返回文件路径
+
+    ONNX 的 INT8 使用 onnxruntime 的动态量化；OpenVINO 的 INT8 由 ultralytics 导出时完成。
+    """
+    stem = os.path.splitext(weights)[0]
+    suffix = '_{}_b{}{}'.format(imgsz, batch, '_int8' if int8 else '')
+    if fmt == 'onnx':
+        target = stem + suffix + '.onnx'
+    else:
+        target = stem + suffix + '_openvino_model'
+    if os.path.exists(target):
+        return target
+
+    from ultralytics import YOLO
+    print(f"导出{fmt}模型: {target}")
+    kwargs = {'format': fmt, 'imgsz': imgsz, 'batch': batch, 'dynamic': False}
+    if fmt == 'openvino' and int8:
+        kwargs['int8'] = True
+    exported = YOLO(weights).export(**kwargs)
+
+    if fmt == 'onnx' and int8:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(exported, target, weight_type=QuantType.QUInt8)
+    else:
+        os.replace(exported, target)
+    return target
+
+
+def _parse_names(text):
+    try:
+        return {int(k): v for k, v in ast.literal_eval(text).items()}
+    except (ValueError, SyntaxError, AttributeError):
+        return {}
+
+
+def _read_openvino_names(export_dir):
+    # ultralytics 把类别名写在导出目录的 metadata.yaml 中，格式为 "  0: person"
+    path = os.path.join(export_dir, 'metadata.yaml')
+    names = {}
+    if not os.path.exists(path):
+        return names
+    in_names = False
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.startswith('names:'):
+                in_names = True
+                continue
+            if in_names:
+                if not line.startswith('  '):
+                    break
+                key, _, value = line.strip().partition(':')
+                if key.isdigit():
+                    names[int(key)] = value.strip().strip("'\"")
+    return names
+
+
+def load_backend(config=None):
+    """
+    按配置创建推理后端
+
+    参数:
+        config: 配置字典，未给出的项使用 DEFAULT_CONFIG；
+                环境变量 CAR_INFERENCE_BACKEND 可以覆盖 backend
+    """
+    config = dict(DEFAULT_CONFIG, **(config or {}))
+    config['backend'] = os.environ.get('CAR_INFERENCE_BACKEND', config['backend'])
+    if config['backend'] not in BACKENDS:
+        raise ValueError("未知的推理后端: {}，可选: {}".format(config['backend'], ', '.join(BACKENDS)))
+    return BACKENDS[config['backend']](config)
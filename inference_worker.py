@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+目标检测工作线程
+从 camera.CameraRegistry 中每个已打开的摄像头读取最新帧，拼成一批调用一次 model([...])，
+跟不上帧率时直接跳过中间的帧，只发布每个摄像头最新一帧的检测结果。
+视频流只需要把最近一次的检测结果画到当前帧上，显示帧率不再受检测速度限制；
+无论有多少个浏览器在观看，每一帧最多只做一次检测。
+"""
+
+import threading
+import time
+
+import numpy as np
+
+
+class Detections:
+    """
+    一帧的检测结果
+
+    boxes 为 (N, 4) 的 xyxy 像素坐标，classes / scores 为长度 N 的数组，
+    frame_id 为检测所用帧在 VideoCamera 中的序号。
+    """
+
+    def __init__(self, frame_id, boxes, classes, scores, names, latency=0.0):
+        self.frame_id = frame_id
+        self.boxes = boxes
+        self.classes = classes
+        self.scores = scores
+        self.names = names
+        self.latency = latency
+        self.timestamp = time.time()
+
+    def __len__(self):
+        return len(self.boxes)
+
+    def label(self, i):
+        return self.names.get(int(self.classes[i]), str(int(self.classes[i])))
+
+    def as_dict(self):
+        return {
+            'frame_id': self.frame_id,
+            'timestamp': self.timestamp,
+            'latency_ms': self.latency * 1000,
+            'boxes': np.round(self.boxes.astype(np.float64), 1).tolist(),
+            'classes': self.classes.tolist(),
+            'labels': [self.label(i) for i in range(len(self))],
+            'scores': np.round(self.scores.astype(np.float64), 3).tolist(),
+        }
+
+    def compact(self):
+        """推送给浏览器的精简格式：f 帧序号，b 展平的整数xyxy坐标，c 类别，s 置信度"""
+        return {
+            'f': self.frame_id,
+            'b': np.round(self.boxes).astype(np.int32).ravel().tolist(),
+            'c': np.asarray(self.classes).tolist(),
+            's': np.round(self.scores.astype(np.float64), 2).tolist(),
+        }
+
+
+class InferenceWorker:
+    """
+    后台检测线程
+
+    参数:
+        cameras: camera.CameraRegistry
+        model: inference_backend.Backend，model([frame, ...]) 返回每帧的 (boxes, classes, scores)
+        enabled: 是否启用检测，可以随时修改
+        max_batch: 每批最多的帧数，摄像头更多时轮流检测
+        gate: 可选的 motion_gate.MotionGate，画面没有变化时跳过检测，沿用上一次的检测结果
+        roi: 可选的 roi(cam_id, frame_shape) -> (x1, y1, x2, y2) 或 None，只在该区域内检测，
+            返回的检测框仍是整幅画面的坐标
+    """
+
+    def __init__(self, cameras, model, enabled=True, max_batch=8, gate=None, roi=None):
+        self.cameras = cameras
+        self.model = model
+        self.enabled = enabled
+        self.max_batch = max_batch
+        self.gate = gate
+        self.roi = roi
+        self.error = None
+        self.processed = 0          # 已检测的帧数
+        self.skipped = 0            # 因为检测跟不上而跳过的帧数
+        self.gated = 0              # 因为画面没有变化而跳过的帧数
+        self.batches = 0
+        self._latency = 0.0
+        self._started = time.monotonic()
+        self._condition = threading.Condition()
+        self._latest = {}           # 摄像头ID -> Detections
+        self._seqs = {}             # 摄像头ID -> 最近检测的帧序号
+        self._running = True
+        self._thread = threading.Thread(target=self._work, name='inference', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self._thread.join(timeout=2.0)
+
+    def latest(self, cam_id):
+        """指定摄像头最近一次的检测结果，检测未启用或还没有结果时返回 None"""
+        with self._condition:
+            return self._latest.get(cam_id) if self.enabled else None
+
+    def wait_result(self, cam_id, after_frame_id=0, timeout=None):
+        """等待指定摄像头比 after_frame_id 更新的检测结果，超时返回 None"""
+        def ready():
+            detections = self._latest.get(cam_id)
+            return detections is not None and detections.frame_id > after_frame_id
+
+        with self._condition:
+            return self._latest[cam_id] if self._condition.wait_for(ready, timeout) else None
+
+    def stats(self):
+        with self._condition:
+            elapsed = time.monotonic() - self._started
+            return {
+                'enabled': self.enabled,
+                'processed': self.processed,
+                'skipped': self.skipped,
+                'gated': self.gated,
+                'gate': self.gate.stats() if self.gate is not None else None,
+                'batches': self.batches,
+                'mean_batch_size': self.processed / self.batches if self.batches else 0.0,
+                'inference_fps': self.processed / elapsed if elapsed > 0 else 0.0,
+                'mean_batch_latency_ms': self._latency / self.batches * 1000 if self.batches else 0.0,
+                'last_frame_ids': {cam_id: d.frame_id for cam_id, d in self._latest.items()},
+                'error': self.error,
+            }
+
+    def _collect(self):
+        """
+        取出每个摄像头还没有检测过的最新帧，已检测帧最旧的摄像头优先
+
+        返回 [(上次检测的帧序号, 摄像头ID, 帧序号, 检测区域图像, 区域左上角坐标)]
+        """
+        candidates = []
+        for cam_id, cam in self.cameras.opened().items():
+            seq, frame = cam.read()
+            last = self._seqs.get(cam_id, 0)
+            if frame is not None and seq > last:
+                candidates.append((last, cam_id, seq, frame))
+        candidates.sort(key=lambda item: item[0])
+
+        batch = []
+        for last, cam_id, seq, frame in candidates:
+            if len(batch) >= self.max_batch:
+                break
+            roi = self.roi(cam_id, frame.shape) if self.roi is not None else None
+            if roi is not None:
+                x1, y1, x2, y2 = roi
+                image, offset = frame[y1:y2, x1:x2], (x1, y1)
+            else:
+                image, offset = frame, None
+            if self.gate is not None and not self.gate.check(cam_id, image, roi):
+                # 画面没有变化，这一帧不检测，上一次的结果记为这一帧的结果（跟踪器据此知道目标没有移动）
+                with self._condition:
+                    self._seqs[cam_id] = seq
+                    self.gated += 1
+                    previous = self._latest.get(cam_id)
+                    if previous is not None:
+                        self._latest[cam_id] = Detections(seq, previous.boxes, previous.classes, previous.scores,
+                                                          previous.names)
+                        self._condition.notify_all()
+                continue
+            batch.append((last, cam_id, seq, image, offset))
+        return batch
+
+    def _work(self):
+        frame_event = self.cameras.frame_event
+        while self._running:
+            if not self.enabled or self.model is None:
+                time.sleep(0.1)
+                continue
+            frame_event.wait(timeout=0.5)
+            frame_event.clear()
+            batch = self._collect()
+            if not batch:
+                continue
+
+            t0 = time.perf_counter()
+            try:
+                # 所有摄像头的最新帧合成一批，只调用一次模型
+                results = self.model([image for _, _, _, image, _ in batch])
+            except Exception as e:
+                if self.gate is not None:
+                    for _, cam_id, _, _, _ in batch:
+                        self.gate.reset(cam_id)
+                if self.error is None:
+                    print(f"YOLOv8检测错误: {e}")
+                self.error = str(e)
+                time.sleep(0.1)
+                continue
+            latency = time.perf_counter() - t0
+
+            with self._condition:
+                for (last, cam_id, seq, _, offset), (boxes, classes, scores) in zip(batch, results):
+                    if offset is not None:
+                        boxes = boxes + np.array(offset * 2, dtype=boxes.dtype)
+                    if last:
+                        self.skipped += max(seq - last - 1, 0)
+                    self._seqs[cam_id] = seq
+                    self._latest[cam_id] = Detections(seq, boxes, classes, scores, self.model.names, latency)
+                self.error = None
+                self.processed += len(batch)
+                self.batches += 1
+                self._latency += latency
+                self._condition.notify_all()
+
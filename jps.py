@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+四邻域跳点搜索 (Jump Point Search)
+
+在大片空旷的地图上，普通A*会扩展大量等价的格子。跳点搜索沿直线“跳跃”，
+只在遇到强迫邻居（障碍物拐角）或终点所在行列时停下，堆中只保存少量跳点。
+
+每张地图的跳跃表只计算一次（按行/列整块向量化），缓存在 Grid.cache 中，
+之后每次查询只需查表，不再逐格扫描。
+"""
+
+import heapq
+
+import numpy as np
+
+_CACHE_KEY = 'jps'
+
+
+class JumpTables:
+    """
+    一张地图的跳跃表
+
+    属性:
+        east, west: 从某格向右/向左移动遇到的第一个跳点下标，撞墙为 -1
+        south, north: 从某格向下/向上移动遇到的第一个跳点下标，撞墙为 -1
+        row_seg, col_seg: 行/列方向上连续可通行区段的编号，用于判断两格之间是否有墙
+    """
+
+    def __init__(self, grid):
+        stride = grid.stride
+        height = grid.rows + 2
+        free = np.frombuffer(bytes(grid.free), dtype=np.uint8).reshape(height, stride).astype(bool)
+        index = np.arange(height * stride, dtype=np.int64).reshape(height, stride)
+
+        # 强迫邻居：水平移动时上/下方可通行，但来向一侧的上/下方是障碍物
+        up = np.zeros_like(free)
+        down = np.zeros_like(free)
+        up[1:, :] = free[:-1, :]
+        down[:-1, :] = free[1:, :]
+        left = np.zeros_like(free)
+        right = np.zeros_like(free)
+        left[:, 1:] = free[:, :-1]
+        right[:, :-1] = free[:, 1:]
+
+        forced_east = free & ((up & ~_shift(up, 0, 1)) | (down & ~_shift(down, 0, 1)))
+        forced_west = free & ((up & ~_shift(up, 0, -1)) | (down & ~_shift(down, 0, -1)))
+        self.east = _scan(forced_east, free, index, axis=1, step=1)
+        self.west = _scan(forced_west, free, index, axis=1, step=-1)
+
+        # 垂直移动时，除了强迫邻居外，向左右能跳到跳点的格子也是跳点
+        horizontal = (self.east != -1) | (self.west != -1)
+        forced_south = free & ((left & ~_shift(left, 1, 0)) | (right & ~_shift(right, 1, 0)) | horizontal)
+        forced_north = free & ((left & ~_shift(left, -1, 0)) | (right & ~_shift(right, -1, 0)) | horizontal)
+        self.south = _scan(forced_south, free, index, axis=0, step=1)
+        self.north = _scan(forced_north, free, index, axis=0, step=-1)
+
+        blocked = ~free
+        self.row_seg = np.cumsum(blocked.ravel(), dtype=np.int64)
+        self.col_seg = np.cumsum(blocked.T.ravel(), dtype=np.int64).reshape(stride, height).T.ravel()
+
+        self.east = self.east.ravel()
+        self.west = self.west.ravel()
+        self.south = self.south.ravel()
+        self.north = self.north.ravel()
+
+
+def _shift(a, dx, dy):
+    """返回 b，使 b[x, y] = a[x - dx, y - dy]，越界部分为False"""
+    b = np.zeros_like(a)
+    rows, cols = a.shape
+    b[max(dx, 0):rows + min(dx, 0), max(dy, 0):cols + min(dy, 0)] = \
+        a[max(-dx, 0):rows + min(-dx, 0), max(-dy, 0):cols + min(-dy, 0)]
+    return b
+
+
+def _scan(forced, free, index, axis, step):
+    """
+    沿 axis 方向按 step 计算每格向前遇到的第一个跳点
+
+    逐行(或逐列)推进，每一步对整列(或整行)做向量化计算。
+    """
+    result = np.full(free.shape, -1, dtype=np.int64)
+    length = free.shape[axis]
+    order = range(length - 2, -1, -1) if step > 0 else range(1, length)
+    take = (lambda a, i: a[:, i]) if axis == 1 else (lambda a, i: a[i, :])
+
+    for i in order:
+        nxt = i + step
+        jumped = np.where(take(forced, nxt), take(index, nxt),
+                          np.where(take(free, nxt), take(result, nxt), -1))
+        if axis == 1:
+            result[:, i] = jumped
+        else:
+            result[i, :] = jumped
+    return result
+
+
+def jump_tables(grid):
+    """获取（必要时计算）地图的跳跃表"""
+    tables = grid.cache.get(_CACHE_KEY)
+    if tables is None:
+        tables = JumpTables(grid)
+        grid.cache[_CACHE_KEY] = tables
+    return tables
+
+
+def _nearest(cur, step, candidates):
+    best = -1
+    for c in candidates:
+        if c != -1 and (best == -1 or abs(c - cur) < abs(best - cur)):
+            best = c
+    return best
+
+
+def _jump(tables, free, stride, cur, step, goal):
+    """从 cur 沿 step 方向跳跃，返回下一个跳点下标，没有时返回 -1"""
+    row_seg = tables.row_seg
+    col_seg = tables.col_seg
+
+    if step == 1 or step == -1:
+        j = int((tables.east if step == 1 else tables.west)[cur])
+        # 终点在同一行且中间没有墙
+        if cur // stride == goal // stride and row_seg[cur] == row_seg[goal] and (goal - cur) * step > 0:
+            return _nearest(cur, step, (j, goal))
+        return j
+
+    j = int((tables.south if step > 0 else tables.north)[cur])
+    candidates = [j]
+    # 终点在同一列且中间没有墙
+    if cur % stride == goal % stride and col_seg[cur] == col_seg[goal] and (goal - cur) * step > 0:
+        candidates.append(goal)
+    # 穿过终点所在行时，若该格向左右能直接走到终点，也是跳点
+    cross = goal - goal % stride + cur % stride
+    if (cross - cur) * step > 0 and free[cross] and col_seg[cross] == col_seg[cur] \
+            and row_seg[cross] == row_seg[goal]:
+        candidates.append(cross)
+    return _nearest(cur, step, candidates)
+
+
+def search(grid, start, goal):
+    """
+    在Grid上执行跳点搜索
+
+    返回:
+        (path, expansions)，path 为路径点列表，找不到路径时为空列表
+    """
+    tables = jump_tables(grid)
+    free = grid.free
+    stride = grid.stride
+    gx, gy = divmod(goal, stride)
+
+    def heuristic(idx):
+        x, y = divmod(idx, stride)
+        return abs(x - gx) + abs(y - gy)
+
+    g = {start: 0}
+    parent = {start: -1}
+    closed = set()
+    h0 = heuristic(start)
+    heap = [(h0, h0, start)]
+    expansions = 0
+
+    while heap:
+        _, _, cur = heapq.heappop(heap)
+        if cur in closed:
+            continue
+        closed.add(cur)
+        expansions += 1
+        if cur == goal:
+            return _expand(grid, parent, goal), expansions
+
+        prev = parent[cur]
+        if prev == -1:
+            steps = (1, -1, stride, -stride)
+        else:
+            diff = cur - prev
+            if abs(diff) < stride:
+                step = 1 if diff > 0 else -1
+                steps = (step, stride, -stride)
+            else:
+                step = stride if diff > 0 else -stride
+                steps = (step, 1, -1)
+
+        for step in steps:
+            nxt = _jump(tables, free, stride, cur, step, goal)
+            if nxt == -1 or nxt in closed:
+                continue
+            dist = abs(nxt - cur) if abs(step) == 1 else abs(nxt - cur) // stride
+            new_g = g[cur] + dist
+            if new_g < g.get(nxt, float('inf')):
+                g[nxt] = new_g
+                parent[nxt] = cur
+                h = heuristic(nxt)
+                heapq.heappush(heap, (new_g + h, h, nxt))
+
+    return [], expansions
+
+
+def _expand(grid, parent, goal):
+    """将跳点序列展开为逐格路径"""
+    jumps = []
+    node = goal
+    while node != -1:
+        jumps.append(node)
+        node = parent[node]
+    jumps.reverse()
+
+    stride = grid.stride
+    path = [list(grid.coords(jumps[0]))]
+    for a, b in zip(jumps, jumps[1:]):
+        step = (1 if b > a else -1) if abs(b - a) < stride else (stride if b > a else -stride)
+        node = a
+        while node != b:
+            node += step
+            path.append(list(grid.coords(node)))
+    return path
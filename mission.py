@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+异步任务执行
+基于 asyncio 执行一条规划好的路径：把运动基元依次提交给 car_control.CarController，
+控制器队列中只保留少量基元，执行期间不阻塞调用方，可以随时取消，或被新的目标抢占。
+进度通过回调函数或队列报告。
+
+在Flask等多线程程序中使用时，先调用 start_background() 在后台线程中运行事件循环，
+再通过 submit() 提交任务。
+"""
+
+import asyncio
+import itertools
+import threading
+import time
+
+from grid import as_grid
+from path_simplify import simplify
+
+
+class Mission:
+    """一次任务的执行状态"""
+
+    def __init__(self, mission_id, goal):
+        self.id = mission_id
+        self.goal = goal
+        self.state = 'pending'      # pending / running / done / cancelled / failed
+        self.step = 0               # 已完成的运动基元数
+        self.total = 0
+        self.position = None
+        self.heading = None
+        self.error = None
+
+    def as_dict(self):
+        return {
+            'id': self.id,
+            'goal': self.goal,
+            'state': self.state,
+            'step': self.step,
+            'total': self.total,
+            'position': self.position,
+            'heading': self.heading,
+            'error': self.error,
+        }
+
+
+class MissionExecutor:
+    """
+    异步任务执行器
+
+    参数:
+        controller: car_control.CarController，为None时使用 car_control.get_controller()
+        speed: 线速度值
+        turn_speed: 角速度值
+        turn_time: 转向90度所需的时间(秒)
+        move_time: 每走一格所需的时间(秒)
+        lookahead: 控制器队列中最多提前提交的运动基元数，越小取消/抢占时需要丢弃的命令越少
+        heading: 小车初始朝向(度)，每次任务结束后更新为最后的朝向
+    """
+
+    def __init__(self, controller=None, speed=0.5, turn_speed=1.0, turn_time=0.8, move_time=1.0,
+                 lookahead=2, heading=0.0):
+        self._controller = controller
+        self.speed = speed
+        self.turn_speed = turn_speed
+        self.turn_time = turn_time
+        self.move_time = move_time
+        self.lookahead = max(1, lookahead)
+        self.heading = heading
+        self.current = None         # 最近一次任务的 Mission
+        self._task = None
+        self._ids = itertools.count(1)
+        self._loop = None
+        self._thread = None
+
+    @property
+    def controller(self):
+        if self._controller is None:
+            # 延迟导入，没有ROS环境时也可以导入本模块
+            from car_control import get_controller
+            self._controller = get_controller()
+        return self._controller
+
+    @staticmethod
+    def _report(progress, mission):
+        if progress is None:
+            return
+        event = mission.as_dict()
+        if hasattr(progress, 'put_nowait'):
+            progress.put_nowait(event)
+        else:
+            progress(event)
+
+    async def execute(self, matrix, path, progress=None, smooth=True):
+        """
+        执行一条路径，直到完成或被取消
+
+        参数:
+            matrix: 地图（嵌套列表、NumPy数组或grid.Grid），用于路径平滑
+            path: 逐格路径 [[x, y], ...]，第一个点为小车当前位置
+            progress: 进度回调函数，或带 put_nowait 方法的队列（queue.Queue / asyncio.Queue），
+                      每完成一个运动基元以及任务结束时收到 Mission.as_dict()
+            smooth: 是否对路径做视线平滑
+
+        返回:
+            Mission；被取消时抛出 asyncio.CancelledError，最终状态可从 self.current 读取
+        """
+        mission = Mission(next(self._ids), list(path[-1]) if path else None)
+        self.current = mission
+        if not path:
+            mission.state = 'failed'
+            mission.error = "路径为空"
+            self._report(progress, mission)
+            return mission
+
+        waypoints, primitives, _ = simplify(as_grid(matrix), path, self.heading, smooth)
+        mission.total = len(primitives)
+        mission.position = list(waypoints[0])
+        mission.heading = self.heading
+        mission.state = 'running'
+        self._report(progress, mission)
+
+        controller = self.controller
+        pending = []                # 已提交基元的 (预计完成时刻, 终点, 朝向, 直行时间)
+        deadline = time.monotonic()
+        heading = self.heading
+        try:
+            for k, (turn, distance) in enumerate(primitives):
+                while len(pending) >= self.lookahead:
+                    await self._finish_next(pending, mission, progress)
+
+                duration = 0.0
+                if abs(turn) > 1e-6:
+                    turn_duration = self.turn_time * abs(turn) / 90.0
+                    controller.command('right' if turn > 0 else 'left', turn_duration,
+                                       self.speed, self.turn_speed)
+                    duration += turn_duration
+                    heading = (heading + turn + 180.0) % 360.0 - 180.0
+                move_duration = self.move_time * distance
+                controller.command('forward', move_duration, self.speed, self.turn_speed)
+                duration += move_duration
+
+                deadline = max(deadline, time.monotonic()) + duration
+                pending.append((deadline, waypoints[k + 1], heading, move_duration))
+
+            while pending:
+                await self._finish_next(pending, mission, progress)
+            # 以控制器实际执行完毕为准
+            await asyncio.get_running_loop().run_in_executor(None, controller.wait)
+        except asyncio.CancelledError:
+            controller.cancel()
+            self._stopped_at(pending, mission)
+            mission.state = 'cancelled'
+            self._report(progress, mission)
+            raise
+        except Exception as e:
+            controller.cancel()
+            mission.state = 'failed'
+            mission.error = str(e)
+            self._report(progress, mission)
+            return mission
+
+        mission.state = 'done'
+        self._report(progress, mission)
+        return mission
+
+    async def _finish_next(self, pending, mission, progress):
+        """等待最早提交的基元执行完，更新位置和朝向"""
+        deadline, position, heading, _ = pending[0]
+        await asyncio.sleep(max(deadline - time.monotonic(), 0))
+        pending.pop(0)
+        mission.step += 1
+        mission.position = list(position)
+        mission.heading = self.heading = heading
+        self._report(progress, mission)
+
+    def _stopped_at(self, pending, mission):
+        """任务中途停车时，按执行中基元的剩余时间估计小车所在的格子和朝向"""
+        if not pending or mission.position is None:
+            return
+        deadline, end, heading, move_duration = pending[0]
+        remaining = deadline - time.monotonic()
+        if move_duration <= 0 or remaining >= move_duration:
+            return                  # 还在转向或者还没开始，位置不变
+        fraction = min(max(1.0 - remaining / move_duration, 0.0), 1.0)
+        start = mission.position
+        mission.position = [int(round(start[0] + (end[0] - start[0]) * fraction)),
+                            int(round(start[1] + (end[1] - start[1]) * fraction))]
+        mission.heading = self.heading = heading
+
+    def start(self, matrix, path, progress=None, smooth=True):
+        """
+        在当前事件循环中启动任务，正在执行的任务会被抢占（取消并停车）
+
+        返回:
+            asyncio.Task
+        """
+        previous = self._task
+        if previous is not None and not previous.done():
+            previous.cancel()
+        self._task = asyncio.ensure_future(self._run_after(previous, matrix, path, progress, smooth))
+        return self._task
+
+    async def _run_after(self, previous, matrix, path, progress, smooth):
+        # 等前一个任务清空控制器队列后再提交新命令
+        if previous is not None and not previous.done():
+            await asyncio.wait([previous])
+        return await self.execute(matrix, path, progress, smooth)
+
+    def cancel(self):
+        """取消正在执行的任务"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+    def running(self):
+        """是否有任务正在执行"""
+        return self._task is not None and not self._task.done()
+
+    def start_background(self):
+        """在后台守护线程中运行事件循环，之后可以在任意线程中调用 submit / cancel_threadsafe"""
+        if self._thread is None:
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, name='mission-executor', daemon=True)
+            self._thread.start()
+        return self
+
+    def submit(self, matrix, path, progress=None, smooth=True):
+        """
+        线程安全地提交任务（会抢占正在执行的任务）
+
+        返回:
+            concurrent.futures.Future，结果为 Mission
+        """
+        if self._loop is None:
+            raise RuntimeError("请先调用 start_background()")
+
+        async def start_and_wait():
+            return await self.start(matrix, path, progress, smooth)
+
+        return asyncio.run_coroutine_threadsafe(start_and_wait(), self._loop)
+
+    def cancel_threadsafe(self):
+        """在其他线程中取消正在执行的任务"""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self.cancel)
+
+    def stop_background(self):
+        """取消任务并结束后台事件循环"""
+        if self._thread is None:
+            return
+        self.cancel_threadsafe()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+        self._thread = None
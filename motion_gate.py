@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+运动门控
+小车停着时摄像头画面几乎不变，没有必要每一帧都做检测。
+把帧缩小、转成灰度后与上一次检测所用的帧做差分，变化的像素比例低于阈值时跳过检测，沿用上一次的检测结果。
+与"上一次检测所用的帧"而不是上一帧比较，缓慢的变化累积起来也会触发检测；超过 max_age 秒没有检测时强制检测一次。
+"""
+
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    按摄像头分别判断画面是否有变化
+
+    参数:
+        width: 差分图像的宽度(像素)，高度按比例缩放
+        pixel_threshold: 灰度差超过该值的像素算作变化
+        area_threshold: 变化像素的比例超过该值时认为画面有变化
+        max_age: 距上次检测超过该时间(秒)时不管画面是否变化都检测，为None时不强制
+    """
+
+    def __init__(self, width=160, pixel_threshold=25, area_threshold=0.002, max_age=2.0):
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.area_threshold = area_threshold
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._references = {}      # 摄像头ID -> (检测区域, 缩小的灰度图, 时刻)
+        self._counts = {}          # 摄像头ID -> [检查次数, 检测次数, 最近的变化比例]
+
+    def _small(self, frame):
+        h, w = frame.shape[:2]
+        size = (self.width, max(int(round(h * self.width / float(w))), 1))
+        small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small
+
+    def check(self, cam_id, frame, roi=None):
+        """
+        判断是否需要对 frame 做检测
+
+        roi 为检测区域，检测区域变化时总是检测。返回 True 时把 frame 记为该摄像头新的参考帧。
+        """
+        small = self._small(frame)
+        now = time.monotonic()
+        with self._lock:
+            counts = self._counts.setdefault(cam_id, [0, 0, 0.0])
+            counts[0] += 1
+            reference = self._references.get(cam_id)
+            if reference is None or reference[0] != roi or reference[1].shape != small.shape:
+                changed = True
+            else:
+                diff = cv2.absdiff(small, reference[1])
+                counts[2] = float(np.count_nonzero(diff > self.pixel_threshold)) / diff.size
+                changed = bool(counts[2] > self.area_threshold)
+                if self.max_age is not None and now - reference[2] > self.max_age:
+                    changed = True
+            if changed:
+                counts[1] += 1
+                self._references[cam_id] = (roi, small, now)
+            return changed
+
+    def reset(self, cam_id=None):
+        """丢弃参考帧（例如检测失败时），下一帧一定检测"""
+        with self._lock:
+            if cam_id is None:
+                self._references.clear()
+            else:
+                self._references.pop(cam_id, None)
+
+    def stats(self):
+        """每个摄像头的检查次数、检测/跳过次数及比例，以及最近一次的变化像素比例，用于调整阈值"""
+        with self._lock:
+            result = {}
+            for cam_id, (checked, run, motion) in self._counts.items():
+                result[cam_id] = {
+                    'checked': checked,
+                    'run': run,
+                    'skipped': checked - run,
+                    'run_ratio': run / float(checked) if checked else 0.0,
+                    'skip_ratio': (checked - run) / float(checked) if checked else 0.0,
+                    'motion': motion,
+                }
+            return result
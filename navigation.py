@@ -0,0 +1,283 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+导航任务队列
+把视频画面上的点击转换为地图上的目标格子，在后台线程中用 dfs 规划路径，
+再交给 mission.MissionExecutor 控制小车执行。HTTP请求只负责提交任务并立即返回任务ID，
+取消和抢占都通过执行器完成，运动基元连续提交给常驻的控制器。
+
+只保留最新的目标：新的点击会取代还在排队或规划中的旧目标，不会越积越多；
+小车同一时间只执行一个任务。
+"""
+
+import concurrent.futures
+import itertools
+import threading
+import time
+from collections import OrderedDict, deque
+
+from dfs import dfs
+from grid import as_grid
+from mission import MissionExecutor
+
+
+class NavigationJob:
+    """一次导航任务的状态"""
+
+    def __init__(self, job_id, pixel, cell):
+        self.id = job_id
+        self.pixel = pixel
+        self.cell = cell
+        # queued / planning / running / done / failed / superseded / cancelled
+        self.state = 'queued'
+        self.step = 0
+        self.total = 0
+        self.path_length = 0
+        self.position = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self.cancel_event = threading.Event()
+
+    def as_dict(self):
+        return {
+            'job_id': self.id,
+            'state': self.state,
+            'pixel': self.pixel,
+            'cell': self.cell,
+            'step': self.step,
+            'total': self.total,
+            'path_length': self.path_length,
+            'position': self.position,
+            'error': self.error,
+            'created': self.created,
+            'finished': self.finished,
+        }
+
+
+class NavigationQueue:
+    """
+    后台导航任务队列
+
+    参数:
+        matrix: 导航地图（嵌套列表、NumPy数组或grid.Grid），0表示通道，1表示障碍物
+        frame_size: 视频画面尺寸 (宽, 高)，点击坐标按比例映射到地图格子
+        start: 小车初始所在的格子 (x, y)
+        workers: 后台线程数，多个线程可以同时规划，但小车同一时间只执行一个任务
+        max_pending: 最多保留的排队任务数，超出时最早的任务被新任务取代
+        history: 保留状态以供查询的任务数
+        algorithm: 路径搜索算法
+        mission_options: 传给 mission.MissionExecutor 的其他参数（speed、move_time、heading 等）
+    """
+
+    def __init__(self, matrix, frame_size=(640, 480), start=(0, 0), workers=1, max_pending=1,
+                 history=100, algorithm='astar', **mission_options):
+        self.grid = as_grid(matrix)
+        self.frame_size = frame_size
+        self.position = list(start)
+        self.heading = mission_options.pop('heading', 0.0)
+        self.max_pending = max(1, max_pending)
+        self.history = history
+        self.algorithm = algorithm
+        self.mission_options = mission_options
+        self._executor = None
+        self._ids = itertools.count(1)
+        self._pending = deque()
+        self._jobs = OrderedDict()
+        self._condition = threading.Condition()
+        self._drive_lock = threading.Lock()
+        self._running = None
+        self._workers = [threading.Thread(target=self._work, name='navigation-{}'.format(i), daemon=True)
+                         for i in range(max(1, workers))]
+        for worker in self._workers:
+            worker.start()
+
+    def pixel_to_cell(self, px, py, frame_size=None):
+        """
+        画面坐标 (px, py) 转换为地图格子 (x, y)，x 为行号，y 为列号
+
+        参数:
+            frame_size: 点击坐标所在画面的尺寸 (宽, 高)，为None时使用 self.frame_size
+        """
+        width, height = frame_size or self.frame_size
+        rows, cols = self.grid.shape
+        x = min(max(int(py * rows / height), 0), rows - 1)
+        y = min(max(int(px * cols / width), 0), cols - 1)
+        return x, y
+
+    def submit(self, px, py, preempt=False, frame_size=None):
+        """
+        提交一个新目标，立即返回 NavigationJob
+
+        参数:
+            px, py: 视频画面上的点击坐标（画面像素）
+            preempt: 是否同时取消正在执行的任务（小车立即停车）
+            frame_size: 画面尺寸 (宽, 高)，为None时使用 self.frame_size
+        """
+        cell = self.pixel_to_cell(px, py, frame_size)
+        with self._condition:
+            job = NavigationJob(next(self._ids), [px, py], list(cell))
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.history:
+                self._jobs.popitem(last=False)
+
+            # 还没开始执行的旧目标直接作废
+            for old in list(self._jobs.values()):
+                if old is not job and old.state in ('queued', 'planning'):
+                    old.state = 'superseded'
+                    old.finished = time.time()
+                    old.cancel_event.set()
+            self._pending = deque(j for j in self._pending if j.state == 'queued')
+            self._pending.append(job)
+            while len(self._pending) > self.max_pending:
+                old = self._pending.popleft()
+                old.state = 'superseded'
+                old.finished = time.time()
+
+            stop = preempt and self._running is not None
+            if stop:
+                self._running.cancel_event.set()
+            self._condition.notify()
+        if stop:
+            self._stop()
+        return job
+
+    def get(self, job_id):
+        """查询任务状态，任务不存在时返回 None"""
+        with self._condition:
+            job = self._jobs.get(job_id)
+            return job.as_dict() if job is not None else None
+
+    def status(self):
+        """队列整体状态：小车位置、正在执行的任务和最近的任务"""
+        with self._condition:
+            return {
+                'position': list(self.position),
+                'heading': self.heading,
+                'running': self._running.id if self._running is not None else None,
+                'pending': [j.id for j in self._pending],
+                'jobs': [j.as_dict() for j in reversed(self._jobs.values())][:10],
+            }
+
+    def cancel(self, job_id=None):
+        """
+        取消指定任务，job_id 为 None 时取消正在执行和排队的所有任务
+
+        返回:
+            实际被取消的任务数（已经结束的任务不计入）
+        """
+        with self._condition:
+            jobs = [self._jobs[job_id]] if job_id in self._jobs else []
+            if job_id is None:
+                jobs = list(self._jobs.values())
+            cancelled = 0
+            running = False
+            for job in jobs:
+                if job.state in ('queued', 'planning', 'running'):
+                    job.cancel_event.set()
+                    cancelled += 1
+                    if job.state == 'running':
+                        running = True
+                    else:
+                        job.state = 'cancelled'
+                        job.finished = time.time()
+            self._pending = deque(j for j in self._pending if j.state == 'queued')
+        if running:
+            self._stop()
+        return cancelled
+
+    def _stop(self):
+        """取消执行器中正在执行的任务并立即停车"""
+        executor = self._executor
+        if executor is not None:
+            executor.cancel_threadsafe()
+
+    def _get_executor(self):
+        if self._executor is None:
+            # 延迟导入：car_control 在没有ROS环境时会直接退出，控制器需要在执行器的事件循环之外创建
+            from car_control import get_controller
+            self._executor = MissionExecutor(get_controller(), heading=self.heading,
+                                             **self.mission_options).start_background()
+        return self._executor
+
+    def _work(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending)
+                job = self._pending.popleft()
+                job.state = 'planning'
+                start = tuple(self.position)
+
+            try:
+                path = dfs(self.grid, start[0], start[1], job.cell[0], job.cell[1], self.algorithm)
+            except Exception as e:
+                self._finish(job, 'failed', "路径规划出错: {}".format(e))
+                continue
+            if not path:
+                self._finish(job, 'failed', "无法找到从{}到{}的路径".format(list(start), job.cell))
+                continue
+
+            # 同一时间只允许一个任务控制小车
+            with self._drive_lock:
+                with self._condition:
+                    if job.cancel_event.is_set() or job.state != 'planning':
+                        continue
+                    if tuple(self.position) != start:
+                        # 规划期间小车位置发生了变化，重新排队规划
+                        job.state = 'queued'
+                        self._pending.appendleft(job)
+                        self._condition.notify()
+                        continue
+                    job.state = 'running'
+                    job.path_length = len(path) - 1
+                    job.position = list(start)
+                    self._running = job
+                self._drive(job, path)
+
+    def _drive(self, job, path):
+        def progress(event):
+            with self._condition:
+                job.step = event['step']
+                job.total = event['total']
+                if event['position'] is not None:
+                    job.position = list(event['position'])
+                    self.position = list(event['position'])
+                if event['heading'] is not None:
+                    self.heading = event['heading']
+
+        try:
+            executor = self._get_executor()
+            future = executor.submit(self.grid, path, progress=progress)
+            while True:
+                try:
+                    mission = future.result(timeout=0.1)
+                    break
+                except concurrent.futures.TimeoutError:
+                    # cancel() 可能发生在提交之前，执行器里还没有这个任务
+                    if job.cancel_event.is_set():
+                        executor.cancel_threadsafe()
+        except concurrent.futures.CancelledError:
+            self._finish(job, 'cancelled')
+            return
+        except (Exception, SystemExit) as e:
+            self._finish(job, 'failed', "执行路径出错: {}".format(e))
+            return
+
+        if mission.state == 'done':
+            self._finish(job, 'done')
+        else:
+            self._finish(job, 'failed', mission.error or "执行过程中无法到达目标")
+
+    def _finish(self, job, state, error=None):
+        with self._condition:
+            if job.state in ('superseded', 'cancelled') and state == 'failed':
+                state = job.state
+            job.state = state
+            job.error = error
+            job.finished = time.time()
+            if self._running is job:
+                self._running = None
+        if error:
+            print("导航任务{}: {}".format(job.id, error))
+
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+叠加层绘制
+直接根据检测结果数组画框和标签，代替 ultralytics 的 results[0].plot()。
+
+标签文字（类别名、置信度、"检测到 N 个对象"、"点击坐标" 等）渲染成带背景色的小图块后缓存起来，
+之后每一帧只需把图块复制到画面上。安装了 Pillow 并找到中文字体时用 Pillow 渲染，可以正确显示中文；
+否则退回 cv2.putText（只能显示ASCII字符）。
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+try:
+    from PIL import Image, ImageDraw, ImageFont
+except ImportError:
+    Image = None
+
+# 常见系统中的中文字体
+FONT_CANDIDATES = [
+    '/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc',
+    '/usr/share/fonts/truetype/wqy/wqy-microhei.ttc',
+    '/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc',
+    '/usr/share/fonts/wenquanyi/wqy-microhei/wqy-microhei.ttc',
+    '/System/Library/Fonts/PingFang.ttc',
+    'C:/Windows/Fonts/msyh.ttc',
+    'C:/Windows/Fonts/simhei.ttf',
+]
+
+# 各类别的框颜色(BGR)
+PALETTE = [
+    (56, 56, 255), (151, 157, 255), (31, 112, 255), (29, 178, 255), (49, 210, 207),
+    (10, 249, 72), (23, 204, 146), (134, 219, 61), (52, 147, 26), (187, 212, 0),
+    (168, 153, 44), (255, 194, 0), (147, 69, 52), (255, 115, 100), (236, 24, 0),
+    (255, 56, 132), (133, 0, 82), (255, 56, 203), (200, 149, 255), (199, 55, 255),
+]
+
+
+def _load_font(font_path, size):
+    if Image is None:
+        return None
+    paths = [font_path] if font_path else FONT_CANDIDATES
+    for path in paths:
+        if path and os.path.exists(path):
+            try:
+                return ImageFont.truetype(path, size)
+            except OSError:
+                continue
+    return None
+
+
+class OverlayRenderer:
+    """
+    带标签图块缓存的叠加层绘制器，可以被多路视频的广播线程同时使用
+
+    参数:
+        font_path: 字体文件，为None时在常见位置查找中文字体
+        font_size: 文字大小(像素)
+        cache_size: 最多缓存的标签图块数
+    """
+
+    def __init__(self, font_path=None, font_size=16, cache_size=512):
+        self.font = _load_font(font_path, font_size)
+        self.font_size = font_size
+        self.cache_size = cache_size
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+        if self.font is None:
+            print("未找到Pillow或中文字体，标签使用cv2.putText绘制（中文无法显示）")
+
+    def tile(self, text, color=(255, 255, 255), background=(0, 0, 0)):
+        """渲染（或从缓存中取出）一个带背景色的文字图块"""
+        key = (text, color, background)
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is not None:
+                self._tiles.move_to_end(key)
+                return tile
+        # 渲染不持有锁，其他线程可以同时取用已缓存的图块；同一个标签偶尔会被重复渲染一次
+        tile = self._render(text, color, background)
+        with self._lock:
+            self._tiles[key] = tile
+            if len(self._tiles) > self.cache_size:
+                self._tiles.popitem(last=False)
+        return tile
+
+    def _render(self, text, color, background):
+        pad = 2
+        if self.font is not None:
+            left, top, right, bottom = self.font.getbbox(text)
+            w, h = max(right - left, 1), max(bottom - top, 1)
+            image = Image.new('RGB', (w + 2 * pad, h + 2 * pad), tuple(background[::-1]))
+            ImageDraw.Draw(image).text((pad - left, pad - top), text, font=self.font, fill=tuple(color[::-1]))
+            return np.ascontiguousarray(np.asarray(image)[:, :, ::-1])
+
+        scale = self.font_size / 30.0
+        (w, h), baseline = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, scale, 1)
+        tile = np.empty((h + baseline + 2 * pad, w + 2 * pad, 3), dtype=np.uint8)
+        tile[:] = background
+        cv2.putText(tile, text, (pad, pad + h), cv2.FONT_HERSHEY_SIMPLEX, scale, color, 1, cv2.LINE_AA)
+        return tile
+
+    @staticmethod
+    def blit(frame, tile, x, y):
+        """把图块复制到 frame 的 (x, y) 处（左上角），超出画面的部分被裁掉，返回图块宽度"""
+        th, tw = tile.shape[:2]
+        fh, fw = frame.shape[:2]
+        x0, y0 = max(x, 0), max(y, 0)
+        x1, y1 = min(x + tw, fw), min(y + th, fh)
+        if x0 < x1 and y0 < y1:
+            frame[y0:y1, x0:x1] = tile[y0 - y:y1 - y, x0 - x:x1 - x]
+        return tw
+
+    def draw_text(self, frame, text, x, y, color=(0, 255, 0), background=(0, 0, 0)):
+        """在 (x, y)（左上角）处绘制一行文字"""
+        return self.blit(frame, self.tile(text, color, background), x, y)
+
+    def draw_detections(self, frame, detections):
+        """把检测框和 "类别 置信度" 标签画到 frame 上（原地修改）"""
+        boxes = detections.boxes.astype(np.int32)
+        for i in range(len(boxes)):
+            x1, y1, x2, y2 = boxes[i]
+            cls = int(detections.classes[i])
+            color = PALETTE[cls % len(PALETTE)]
+            cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+            # 类别名和置信度分开缓存，置信度只有100种取值
+            name = self.tile(detections.label(i), (255, 255, 255), color)
+            score = self.tile(" {:.2f}".format(detections.scores[i]), (255, 255, 255), color)
+            y = y1 - name.shape[0] if y1 >= name.shape[0] else y1
+            x = x1 + self.blit(frame, name, x1, y)
+            self.blit(frame, score, x, y)
+        return frame
+
+    @staticmethod
+    def draw_crosshair(frame, x, y, color=(255, 255, 0)):
+        """在点击位置绘制十字准星和圆圈"""
+        cv2.line(frame, (x - 15, y), (x + 15, y), color, 2)
+        cv2.line(frame, (x, y - 15), (x, y + 15), color, 2)
+        cv2.circle(frame, (x, y), 20, color, 2)
+        return frame
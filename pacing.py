@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+视频流帧率控制
+按单调时钟的绝对截止时间输出帧，处理一帧的时间已经计入帧间隔，不会像固定 sleep 那样让实际帧率越来越低；
+视频源没有新帧时按指数退避等待，而不是空转；绘制+编码跟不上目标帧率时先降低JPEG质量，再降低分辨率，
+负载下降后逐步恢复。
+"""
+
+import time
+
+# 各处理阶段的名称，stats() 中按此顺序输出
+STAGES = ('wait', 'annotate', 'encode')
+
+
+class FramePacer:
+    """
+    帧率控制器
+
+    参数:
+        fps: 目标帧率
+        max_quality / min_quality: JPEG质量的上下限
+        min_scale: 分辨率缩放比例的下限
+        backoff_max: 没有新帧时的最长等待时间(秒)
+    """
+
+    def __init__(self, fps=30.0, max_quality=90, min_quality=40, min_scale=0.5, backoff_max=1.0):
+        self.fps = fps
+        self.period = 1.0 / fps
+        self.max_quality = max_quality
+        self.min_quality = min_quality
+        self.min_scale = min_scale
+        self.backoff_max = backoff_max
+        self.quality = max_quality
+        self.scale = 1.0
+        self.frames = 0
+        self.missed = 0             # 等不到新帧的次数
+        self.late = 0               # 处理完一帧时已经错过下一个截止时间的次数
+        self._deadline = time.monotonic()
+        self._backoff = 0.0
+        self._stage_ema = dict.fromkeys(STAGES, 0.0)
+        self._overloaded = 0
+        self._idle = 0
+        self._fps_ema = 0.0
+        self._last_frame = None
+
+    def resume(self):
+        """暂停一段时间后重新开始输出，从当前时刻重新计算截止时间"""
+        self._deadline = time.monotonic()
+        self._last_frame = None
+
+    def wait(self):
+        """等到下一帧的截止时间"""
+        delay = self._deadline - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def frame_timeout(self):
+        """等待新帧的最长时间：正常时为一个帧间隔，连续没有新帧时逐步加长"""
+        return max(self.period, self._backoff)
+
+    def miss(self):
+        """没有等到新帧，加长下一次的等待时间"""
+        self.missed += 1
+        self._backoff = min(max(self._backoff * 2, self.period), self.backoff_max)
+
+    def done(self, timings):
+        """
+        一帧处理完毕
+
+        参数:
+            timings: 各阶段耗时(秒)，如 {'wait': ..., 'annotate': ..., 'encode': ...}
+        """
+        now = time.monotonic()
+        self._backoff = 0.0
+        self.frames += 1
+        for stage, value in timings.items():
+            previous = self._stage_ema.get(stage)
+            self._stage_ema[stage] = value if self.frames == 1 or previous is None else 0.9 * previous + 0.1 * value
+        if self._last_frame is not None:
+            interval = now - self._last_frame
+            if interval > 0:
+                self._fps_ema = 0.9 * self._fps_ema + 0.1 / interval if self._fps_ema else 1.0 / interval
+        self._last_frame = now
+
+        # 下一帧的截止时间，落后时从当前时刻重新计算，不补发
+        self._deadline += self.period
+        if self._deadline < now:
+            self.late += 1
+            self._deadline = now
+        self._adapt(timings.get('annotate', 0.0) + timings.get('encode', 0.0))
+
+    def _adapt(self, busy):
+        if busy > 0.8 * self.period:
+            self._overloaded += 1
+            self._idle = 0
+        elif busy < 0.4 * self.period:
+            self._idle += 1
+            self._overloaded = 0
+        else:
+            self._overloaded = self._idle = 0
+
+        if self._overloaded >= 5:
+            # 先降低质量，质量到下限后再降低分辨率
+            if self.quality > self.min_quality:
+                self.quality = max(self.quality - 10, self.min_quality)
+            elif self.scale > self.min_scale:
+                self.scale = max(self.scale * 0.75, self.min_scale)
+            self._overloaded = 0
+        elif self._idle >= 60:
+            # 恢复时先恢复分辨率
+            if self.scale < 1.0:
+                self.scale = min(self.scale / 0.75, 1.0)
+            elif self.quality < self.max_quality:
+                self.quality = min(self.quality + 10, self.max_quality)
+            self._idle = 0
+
+    def stats(self):
+        return {
+            'target_fps': self.fps,
+            'fps': self._fps_ema,
+            'frames': self.frames,
+            'missed': self.missed,
+            'late': self.late,
+            'quality': self.quality,
+            'scale': self.scale,
+            'stages_ms': {stage: self._stage_ema.get(stage, 0.0) * 1000 for stage in STAGES},
+        }
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+路径缓存
+小车经常在同一张地图的几个停靠点之间往返，规划结果按 (地图指纹, 起点, 终点, 算法) 缓存，
+采用LRU淘汰，并限制缓存条数和路径点总数。
+
+地图通过 Grid.update / Grid.set_map 修改时，该地图的缓存条目会被自动清除。
+"""
+
+import threading
+from collections import OrderedDict
+
+from grid import as_grid
+from planner import plan
+
+
+class PathCache:
+    """
+    LRU路径缓存
+
+    参数:
+        max_entries: 最多缓存的路径条数
+        max_points: 所有缓存路径的路径点总数上限，用于限制内存占用
+    """
+
+    def __init__(self, max_entries=128, max_points=200000):
+        self.max_entries = max_entries
+        self.max_points = max_points
+        self._entries = OrderedDict()   # (指纹, 起点, 终点, 算法) -> 路径
+        self._points = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, grid, start, goal, algorithm='astar'):
+        """
+        查询缓存，未命中时返回 None
+
+        反方向（终点到起点）的路径已缓存时，直接返回其逆序。
+        """
+        grid.subscribe(self._on_map_changed)
+        fingerprint = grid.fingerprint
+        with self._lock:
+            key = (fingerprint, tuple(start), tuple(goal), algorithm)
+            path = self._entries.get(key)
+            if path is None:
+                reverse = self._entries.get((fingerprint, tuple(goal), tuple(start), algorithm))
+                if reverse is not None:
+                    self._entries.move_to_end((fingerprint, tuple(goal), tuple(start), algorithm))
+                    self.hits += 1
+                    return [list(p) for p in reversed(reverse)]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return [list(p) for p in path]
+
+    def put(self, grid, start, goal, path, algorithm='astar'):
+        """缓存一条路径（空路径不缓存）"""
+        if not path or len(path) > self.max_points:
+            return
+        grid.subscribe(self._on_map_changed)
+        key = (grid.fingerprint, tuple(start), tuple(goal), algorithm)
+        stored = tuple(tuple(p) for p in path)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._points -= len(old)
+            self._entries[key] = stored
+            self._points += len(stored)
+            while len(self._entries) > self.max_entries or self._points > self.max_points:
+                _, evicted = self._entries.popitem(last=False)
+                self._points -= len(evicted)
+                self.evictions += 1
+
+    def find_path(self, matrix, start_x, start_y, end_x, end_y, algorithm='astar'):
+        """带缓存的路径规划，参数和返回值与 planner.find_path 相同"""
+        grid = as_grid(matrix)
+        start, goal = (start_x, start_y), (end_x, end_y)
+        path = self.get(grid, start, goal, algorithm)
+        if path is None:
+            path = plan(grid, start_x, start_y, end_x, end_y, algorithm).path
+            self.put(grid, start, goal, path, algorithm)
+        return path
+
+    def invalidate(self, fingerprint=None):
+        """清除某张地图的全部缓存，fingerprint 为 None 时清空整个缓存"""
+        with self._lock:
+            if fingerprint is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                self._points = 0
+            else:
+                keys = [k for k in self._entries if k[0] == fingerprint]
+                for k in keys:
+                    self._points -= len(self._entries.pop(k))
+                removed = len(keys)
+            self.invalidations += removed
+        return removed
+
+    def _on_map_changed(self, grid, old_fingerprint, changed):
+        if old_fingerprint is not None:
+            self.invalidate(old_fingerprint)
+
+    def stats(self):
+        """返回缓存统计信息，用于确定缓存大小"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'points': self._points,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+路径后处理
+将规划器输出的逐格路径压缩为少量的运动基元 (转向角度, 直行距离)：
+  1. 合并同一方向上的连续步，只保留拐点
+  2. 视线平滑：两个路径点之间的线段不经过障碍物时，跳过中间的路径点
+  3. 根据小车当前朝向，把路径点序列转换为运动基元
+
+朝向约定与 path_follower 一致：0度为地图"向下"(x增大)，90度为"向右"(y增大)，
+转向角为正表示右转，为负表示左转。
+"""
+
+import math
+
+from grid import as_grid
+
+
+def turning_points(path):
+    """合并共线的连续步，只保留起点、拐点和终点"""
+    if len(path) <= 2:
+        return [list(p) for p in path]
+    points = [list(path[0])]
+    for prev, cur, nxt in zip(path, path[1:], path[2:]):
+        if (cur[0] - prev[0], cur[1] - prev[1]) != (nxt[0] - cur[0], nxt[1] - cur[1]):
+            points.append(list(cur))
+    points.append(list(path[-1]))
+    return points
+
+
+def segment_cells(a, b):
+    """
+    线段 a-b（格子中心连线）经过的所有格子
+
+    线段恰好穿过格子角点时，两侧的格子都算作经过，保证车身不会擦到障碍物的角。
+    """
+    x, y = a
+    dx, dy = b[0] - x, b[1] - y
+    nx, ny = abs(dx), abs(dy)
+    sx = 1 if dx > 0 else -1
+    sy = 1 if dy > 0 else -1
+    cells = [(x, y)]
+    ix = iy = 0
+    while ix < nx or iy < ny:
+        decision = (1 + 2 * ix) * ny - (1 + 2 * iy) * nx
+        if decision == 0:
+            cells.append((x + sx, y))
+            cells.append((x, y + sy))
+            x += sx
+            y += sy
+            ix += 1
+            iy += 1
+        elif decision < 0:
+            x += sx
+            ix += 1
+        else:
+            y += sy
+            iy += 1
+        cells.append((x, y))
+    return cells
+
+
+def line_of_sight(grid, a, b):
+    """判断两个格子之间的直线是否畅通"""
+    return all(grid.is_free(x, y) for x, y in segment_cells(a, b))
+
+
+def smooth_path(matrix, path):
+    """
+    视线平滑：从当前路径点出发，直接连到能看到的最远路径点
+
+    参数:
+        matrix: 地图（嵌套列表、NumPy数组或grid.Grid）
+        path: 逐格路径 [[x, y], ...]
+
+    返回:
+        平滑后的路径点列表，相邻两点之间的线段不经过障碍物
+    """
+    grid = as_grid(matrix)
+    points = turning_points(path)
+    if len(points) <= 2:
+        return points
+    result = [points[0]]
+    i = 0
+    while i < len(points) - 1:
+        j = len(points) - 1
+        while j > i + 1 and not line_of_sight(grid, points[i], points[j]):
+            j -= 1
+        result.append(points[j])
+        i = j
+    return _drop_collinear(result)
+
+
+def _drop_collinear(points):
+    """去掉与前后两点同向共线的中间点"""
+    result = [points[0]]
+    for cur, nxt in zip(points[1:], points[2:]):
+        prev = result[-1]
+        ax, ay = cur[0] - prev[0], cur[1] - prev[1]
+        bx, by = nxt[0] - cur[0], nxt[1] - cur[1]
+        if ax * by - ay * bx != 0 or ax * bx + ay * by <= 0:
+            result.append(cur)
+    result.append(points[-1])
+    return result
+
+
+def _normalize(angle):
+    """将角度规范到 (-180, 180]"""
+    angle = (angle + 180.0) % 360.0 - 180.0
+    return 180.0 if angle == -180.0 else angle
+
+
+def to_primitives(waypoints, heading=0.0):
+    """
+    将路径点序列转换为运动基元
+
+    参数:
+        waypoints: 路径点列表 [[x, y], ...]
+        heading: 小车当前朝向(度)
+
+    返回:
+        (primitives, heading)，primitives 为 [(转向角度, 直行距离), ...]，
+        第 i 个基元对应 waypoints[i] 到 waypoints[i + 1] 这一段，
+        距离单位为格子，heading 为执行完所有基元后的朝向
+    """
+    primitives = []
+    for a, b in zip(waypoints, waypoints[1:]):
+        dx, dy = b[0] - a[0], b[1] - a[1]
+        target = math.degrees(math.atan2(dy, dx))
+        primitives.append((_normalize(target - heading), math.hypot(dx, dy)))
+        heading = target
+    return primitives, heading
+
+
+def simplify(matrix, path, heading=0.0, smooth=True):
+    """
+    路径后处理的完整流程
+
+    参数:
+        matrix: 地图（嵌套列表、NumPy数组或grid.Grid）
+        path: 逐格路径
+        heading: 小车当前朝向(度)
+        smooth: 是否做视线平滑，为False时只合并共线的步，小车只做90度倍数的转向
+
+    返回:
+        (waypoints, primitives, heading)
+    """
+    waypoints = smooth_path(matrix, path) if smooth else turning_points(path)
+    primitives, heading = to_primitives(waypoints, heading)
+    return waypoints, primitives, heading
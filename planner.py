@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+路径规划引擎
+提供迭代式的 BFS / A* / Dijkstra 搜索，替代递归的DFS算法，
+以及适合大片空旷地图的跳点搜索(jps.py)和分层规划(hpa.py)
+
+地图在搜索前一次性转换为 grid.Grid（带障碍物边框的一维可通行数组），
+这样内层循环只需要按一维下标访问，不再做边界检查，也不会触发递归深度限制。
+"""
+
+import heapq
+import time
+from array import array
+from collections import deque
+
+import jps
+from grid import as_grid
+
+
+class PlanResult:
+    """一次路径规划的结果及统计信息"""
+
+    def __init__(self, path, algorithm, expansions, elapsed):
+        self.path = path                # 路径点列表 [[x, y], ...]，找不到时为空列表
+        self.algorithm = algorithm      # 使用的搜索算法
+        self.expansions = expansions    # 扩展的节点数
+        self.elapsed = elapsed          # 搜索耗时(秒)
+
+    @property
+    def found(self):
+        return len(self.path) > 0
+
+    @property
+    def cost(self):
+        return len(self.path) - 1 if self.path else None
+
+    def __repr__(self):
+        return "PlanResult(algorithm={}, length={}, expansions={}, elapsed={:.4f}s)".format(
+            self.algorithm, len(self.path), self.expansions, self.elapsed)
+
+
+def _reconstruct(grid, parent, goal):
+    path = []
+    node = goal
+    while node != -1:
+        x, y = grid.coords(node)
+        path.append([x, y])
+        node = parent[node]
+    path.reverse()
+    return path
+
+
+def _bfs(grid, start, goal):
+    """返回 (path, expansions)，其余搜索函数相同"""
+    free = grid.free
+    offsets = grid.offsets
+    n = len(free)
+    parent = array('l', [-1]) * n
+    visited = bytearray(n)
+    visited[start] = 1
+    queue = deque([start])
+    expansions = 0
+
+    while queue:
+        cur = queue.popleft()
+        expansions += 1
+        for off in offsets:
+            nxt = cur + off
+            if visited[nxt] or not free[nxt]:
+                continue
+            visited[nxt] = 1
+            parent[nxt] = cur
+            if nxt == goal:
+                return _reconstruct(grid, parent, goal), expansions
+            queue.append(nxt)
+
+    return [], expansions
+
+
+def _best_first(grid, start, goal, use_heuristic):
+    """A* 与 Dijkstra 共用的堆搜索，use_heuristic=False 时退化为 Dijkstra"""
+    free = grid.free
+    offsets = grid.offsets
+    stride = grid.stride
+    n = len(free)
+    parent = array('l', [-1]) * n
+    closed = bytearray(n)
+    g = [float('inf')] * n
+    gx, gy = divmod(goal, stride)
+
+    def heuristic(idx):
+        x, y = divmod(idx, stride)
+        return abs(x - gx) + abs(y - gy)
+
+    h0 = heuristic(start) if use_heuristic else 0
+    g[start] = 0
+    # 堆元素为 (f, h, 下标)，f相同时优先扩展离终点更近的节点
+    heap = [(h0, h0, start)]
+    expansions = 0
+
+    while heap:
+        _, _, cur = heapq.heappop(heap)
+        if closed[cur]:
+            continue
+        closed[cur] = 1
+        expansions += 1
+        if cur == goal:
+            return _reconstruct(grid, parent, goal), expansions
+
+        new_g = g[cur] + 1
+        for off in offsets:
+            nxt = cur + off
+            if closed[nxt] or not free[nxt] or new_g >= g[nxt]:
+                continue
+            g[nxt] = new_g
+            parent[nxt] = cur
+            h = heuristic(nxt) if use_heuristic else 0
+            heapq.heappush(heap, (new_g + h, h, nxt))
+
+    return [], expansions
+
+
+def _astar(grid, start, goal):
+    return _best_first(grid, start, goal, True)
+
+
+def _dijkstra(grid, start, goal):
+    return _best_first(grid, start, goal, False)
+
+
+def _jps(grid, start, goal):
+    return jps.search(grid, start, goal)
+
+
+def _hpa(grid, start, goal):
+    # hpa 模块在细化路径时会调用 plan，这里延迟导入避免循环引用
+    from hpa import hierarchy
+    return hierarchy(grid).search(start, goal)
+
+
+# 可选的搜索算法
+ALGORITHMS = {
+    'bfs': _bfs,
+    'astar': _astar,
+    'dijkstra': _dijkstra,
+    'jps': _jps,
+    'hpa': _hpa,
+}
+
+
+def plan(matrix, start_x, start_y, end_x, end_y, algorithm='astar', inflate_radius=0):
+    """
+    在地图上规划从起点到终点的最短路径
+
+    参数:
+        matrix: 地图矩阵（嵌套列表、NumPy数组或grid.Grid），0表示通道，非0表示障碍物
+                重复规划同一张地图时建议传入Grid，避免每次重新转换
+        start_x, start_y: 起点坐标
+        end_x, end_y: 终点坐标
+        algorithm: 搜索算法，可选 'bfs', 'astar', 'dijkstra', 'jps', 'hpa'
+                   （'hpa' 的路径接近最短但不保证最短）
+        inflate_radius: 障碍物膨胀半径(格子数)，matrix已经是Grid时忽略
+
+    返回:
+        PlanResult 对象
+    """
+    if algorithm not in ALGORITHMS:
+        raise ValueError("未知的搜索算法: {}".format(algorithm))
+
+    t0 = time.perf_counter()
+    grid = as_grid(matrix, inflate_radius)
+
+    if not grid.is_free(start_x, start_y) or not grid.is_free(end_x, end_y):
+        return PlanResult([], algorithm, 0, time.perf_counter() - t0)
+
+    start = grid.index(start_x, start_y)
+    goal = grid.index(end_x, end_y)
+    if start == goal:
+        return PlanResult([[start_x, start_y]], algorithm, 0, time.perf_counter() - t0)
+
+    path, expansions = ALGORITHMS[algorithm](grid, start, goal)
+    return PlanResult(path, algorithm, expansions, time.perf_counter() - t0)
+
+
+def find_path(matrix, start_x, start_y, end_x, end_y, algorithm='astar', inflate_radius=0):
+    """规划路径并只返回路径点列表，找不到路径时返回空列表"""
+    return plan(matrix, start_x, start_y, end_x, end_y, algorithm, inflate_radius).path
+
+
+# 测试代码
+if __name__ == "__main__":
+    test_map = [
+        [0, 0, 1, 0, 0],
+        [0, 1, 0, 0, 1],
+        [0, 0, 0, 1, 0],
+        [1, 1, 0, 0, 0],
+        [0, 0, 0, 1, 0]
+    ]
+
+    for name in ALGORITHMS:
+        result = plan(test_map, 0, 0, 4, 4, name)
+        print(result)
+        print("路径:", " -> ".join("({}, {})".format(p[0], p[1]) for p in result.path))
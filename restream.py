@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+RTSP直通转发
+小车摄像头的RTSP视频本身就是H.264编码的。用 ffmpeg 把原始码流不解码、不重新编码地
+封装成HLS（fMP4分片），写到本地目录，由Flask作为静态文件提供给浏览器播放。
+观看者不再占用服务器的JPEG编码，带宽也与摄像头的原始码率相同；
+检测仍然使用 camera.VideoCamera 解码出来的画面，两条路径互不影响。
+
+ffmpeg 需要单独安装；没有 ffmpeg 时 available() 返回 False，只能使用MJPEG视频流。
+"""
+
+import os
+import shutil
+import subprocess
+import threading
+import time
+
+
+class HlsRestreamer:
+    """
+    把一路视频源转封装为HLS的 ffmpeg 子进程
+
+    参数:
+        source: RTSP地址或视频文件
+        directory: HLS播放列表和分片的输出目录
+        ffmpeg: ffmpeg 可执行文件
+        segment_time: 每个分片的目标时长(秒)，实际按关键帧切分
+        list_size: 播放列表中保留的分片数，更早的分片被删除
+        idle_timeout: 超过该时间(秒)没有观看者请求时停止 ffmpeg，下次请求时重新启动
+        restart_delay: ffmpeg 退出（视频流中断）后重新启动前的等待时间(秒)
+    """
+
+    def __init__(self, source, directory, ffmpeg='ffmpeg', segment_time=1.0, list_size=6, idle_timeout=30.0,
+                 restart_delay=2.0):
+        self.source = source
+        self.directory = directory
+        self.ffmpeg = ffmpeg
+        self.segment_time = segment_time
+        self.list_size = list_size
+        self.idle_timeout = idle_timeout
+        self.restart_delay = restart_delay
+        self.playlist = os.path.join(directory, 'index.m3u8')
+        self.process = None
+        self.restarts = 0
+        self.started = None
+        self._last_request = 0.0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def available(self):
+        """是否找到了 ffmpeg"""
+        return shutil.which(self.ffmpeg) is not None
+
+    def command(self):
+        command = [self.ffmpeg, '-nostdin', '-loglevel', 'warning']
+        source = str(self.source)
+        if source.startswith('rtsp://'):
+            command += ['-rtsp_transport', 'tcp']
+        elif os.path.exists(source):
+            # 视频文件按原始帧率读取，模拟实时视频流
+            command += ['-re', '-stream_loop', '-1']
+        command += [
+            '-i', source,
+            # 只取视频，直接复制H.264码流，不解码
+            '-map', '0:v:0', '-c', 'copy',
+            '-f', 'hls',
+            '-hls_time', str(self.segment_time),
+            '-hls_list_size', str(self.list_size),
+            '-hls_flags', 'delete_segments+independent_segments+omit_endlist',
+            '-hls_segment_type', 'fmp4',
+            '-hls_fmp4_init_filename', 'init.mp4',
+            '-hls_segment_filename', os.path.join(self.directory, 'seg_%05d.m4s'),
+            self.playlist,
+        ]
+        return command
+
+    def touch(self):
+        """记录一次观看者请求，ffmpeg 没有运行时启动它"""
+        with self._lock:
+            self._last_request = time.monotonic()
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._supervise, name='hls-restream', daemon=True)
+                self._thread.start()
+
+    def ready(self):
+        """播放列表是否已经生成"""
+        return os.path.exists(self.playlist)
+
+    def stop(self):
+        with self._lock:
+            self._last_request = 0.0
+        self._terminate()
+
+    def _terminate(self):
+        process = self.process
+        if process is not None and process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=5.0)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def _idle(self):
+        with self._lock:
+            return time.monotonic() - self._last_request > self.idle_timeout
+
+    def _supervise(self):
+        os.makedirs(self.directory, exist_ok=True)
+        while not self._idle():
+            # 清除上一次运行留下的分片，播放器不会拿到过期的播放列表
+            for name in os.listdir(self.directory):
+                os.remove(os.path.join(self.directory, name))
+            self.process = subprocess.Popen(self.command(), stdin=subprocess.DEVNULL)
+            self.started = time.time()
+            while self.process.poll() is None:
+                if self._idle():
+                    print("HLS转发: 没有观看者，停止 ffmpeg")
+                    self._terminate()
+                    break
+                time.sleep(1.0)
+            else:
+                if self._idle():
+                    break
+                # 视频流中断，等待后重新启动
+                print("HLS转发: ffmpeg 退出(退出码 {})，{}秒后重新启动".format(self.process.returncode,
+                                                                      self.restart_delay))
+                self.restarts += 1
+                time.sleep(self.restart_delay)
+        self.started = None
+
+    def stats(self):
+        """ffmpeg 状态、当前分片数、分片总字节数和按分片估算的码率(kbit/s)"""
+        segments = []
+        if os.path.isdir(self.directory):
+            for name in os.listdir(self.directory):
+                if name.endswith('.m4s'):
+                    try:
+                        segments.append(os.path.getsize(os.path.join(self.directory, name)))
+                    except OSError:
+                        pass        # 分片刚好被 ffmpeg 删除
+        total = sum(segments)
+        duration = len(segments) * self.segment_time
+        return {
+            'available': self.available(),
+            'running': self.process is not None and self.process.poll() is None,
+            'pid': self.process.pid if self.process is not None else None,
+            'restarts': self.restarts,
+            'started': self.started,
+            'segments': len(segments),
+            'bytes': total,
+            'bitrate_kbps': total * 8 / 1000.0 / duration if duration else 0.0,
+        }
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+后台图像保存
+/save_frame 只负责把当前画面（已经绘制好检测结果的图像）放入有界队列并立即返回文件名，
+JPEG编码和写文件在后台线程中完成，保存是否完成可以按任务ID查询。
+队列满时直接拒绝新的请求，不会在内存中无限积压图像。
+"""
+
+import datetime
+import itertools
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+
+
+class SaveJob:
+    """一次保存任务的状态"""
+
+    def __init__(self, job_id, filename, path):
+        self.id = job_id
+        self.filename = filename
+        self.path = path
+        # queued / writing / done / failed
+        self.state = 'queued'
+        self.error = None
+        self.size = 0
+        self.created = time.time()
+        self.finished = None
+
+    def as_dict(self):
+        return {
+            'job_id': self.id,
+            'state': self.state,
+            'filename': self.filename,
+            'size': self.size,
+            'error': self.error,
+            'created': self.created,
+            'finished': self.finished,
+        }
+
+
+class SnapshotWriter:
+    """
+    后台JPEG写入线程
+
+    参数:
+        directory: 保存目录
+        max_queue: 最多排队的图像数，队列满时 submit 返回 None
+        workers: 写入线程数
+        quality: JPEG质量
+        history: 保留状态以供查询的任务数
+    """
+
+    def __init__(self, directory, max_queue=16, workers=1, quality=95, history=200):
+        self.directory = directory
+        self.quality = quality
+        self.history = history
+        self.written = 0
+        self.failed = 0
+        self.rejected = 0
+        self._ids = itertools.count(1)
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._threads = [threading.Thread(target=self._work, name='snapshot-writer', daemon=True)
+                         for _ in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def filename(self, job_id, prefix='frame', ext='.jpg'):
+        """带毫秒时间戳和任务ID的文件名，同一秒内连续保存也不会重名"""
+        now = datetime.datetime.now()
+        return "{}_{}-{:03d}_{}{}".format(prefix, now.strftime("%Y%m%d-%H%M%S"), now.microsecond // 1000,
+                                          job_id, ext)
+
+    def submit(self, image, prefix='frame'):
+        """
+        提交一张图像（BGR数组，或已经编码好的JPEG bytes），立即返回 SaveJob
+
+        调用方提交后不能再修改 image。队列已满时返回 None。
+        """
+        job_id = next(self._ids)
+        filename = self.filename(job_id, prefix)
+        job = SaveJob(job_id, filename, os.path.join(self.directory, filename))
+        try:
+            self._queue.put_nowait((job, image))
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            return None
+        with self._lock:
+            self._jobs[job_id] = job
+            while len(self._jobs) > self.history:
+                self._jobs.popitem(last=False)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.as_dict() if job is not None else None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queued': self._queue.qsize(),
+                'max_queue': self._queue.maxsize,
+                'written': self.written,
+                'failed': self.failed,
+                'rejected': self.rejected,
+            }
+
+    def _work(self):
+        while True:
+            job, image = self._queue.get()
+            job.state = 'writing'
+            try:
+                if isinstance(image, bytes):
+                    data = image
+                else:
+                    ok, jpeg = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+                    if not ok:
+                        raise RuntimeError("JPEG编码失败")
+                    data = jpeg.tobytes()
+                with open(job.path, 'wb') as f:
+                    f.write(data)
+                job.size = len(data)
+                job.state = 'done'
+                with self._lock:
+                    self.written += 1
+            except Exception as e:
+                print(f"保存图像时出错: {e}")
+                job.state = 'failed'
+                job.error = str(e)
+                with self._lock:
+                    self.failed += 1
+            job.finished = time.time()
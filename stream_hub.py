@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+视频流广播
+每一帧只绘制和JPEG编码一次，编码后的同一个 bytes 对象分发给所有 /video_feed 客户端。
+输出帧率由 pacing.FramePacer 控制，负载过高时自动降低JPEG质量和分辨率。
+每个客户端有自己的有界队列，队列满时丢弃最旧的帧，慢客户端不会拖慢其他客户端；
+每个客户端的丢帧数和落后的帧数可以通过 stats() 查看。
+"""
+
+import itertools
+import threading
+import time
+from collections import deque
+
+import cv2
+
+from pacing import FramePacer
+
+
+class Subscriber:
+    """一个视频流客户端的帧队列"""
+
+    def __init__(self, client_id, max_queue=2):
+        self.id = client_id
+        self._queue = deque(maxlen=max_queue)
+        self._condition = threading.Condition()
+        self.closed = False
+        self.sent = 0               # 已取走的帧数
+        self.dropped = 0            # 队列满时被丢弃的帧数
+        self.last_seq = 0           # 最后取走的帧序号
+        self.connected = time.time()
+
+    def push(self, seq, data):
+        with self._condition:
+            if len(self._queue) == self._queue.maxlen:
+                self.dropped += 1
+            self._queue.append((seq, data))
+            self._condition.notify()
+
+    def get(self, timeout=None):
+        """
+        取出最早的一帧
+
+        返回:
+            (帧序号, JPEG数据)，超时或已关闭时返回 None
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._queue or self.closed, timeout) or not self._queue:
+                return None
+            seq, data = self._queue.popleft()
+            self.sent += 1
+            self.last_seq = seq
+            return seq, data
+
+    def close(self):
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+
+    def stats(self, latest_seq):
+        with self._condition:
+            return {
+                'id': self.id,
+                'queued': len(self._queue),
+                'sent': self.sent,
+                'dropped': self.dropped,
+                'lag': max(latest_seq - self.last_seq, 0) if self.last_seq else 0,
+                'connected': self.connected,
+            }
+
+
+class BroadcastHub:
+    """
+    编码一次、分发给所有客户端的广播线程
+
+    参数:
+        camera: camera.VideoCamera
+        annotate: annotate(frame, seq) -> 图像，负责叠加检测结果，不能修改传入的帧，seq 为帧序号
+        max_queue: 每个客户端队列的长度
+        fps: 目标帧率
+    """
+
+    def __init__(self, camera, annotate, max_queue=2, fps=30.0):
+        self.camera = camera
+        self.annotate = annotate
+        self.max_queue = max_queue
+        self.pacer = FramePacer(fps)
+        self.encoded = 0            # 编码的帧数
+        self.seq = 0                # 最近一次编码的帧序号
+        self.errors = 0             # 绘制或编码出错而跳过的帧数
+        self._last_error = None
+        self._ids = itertools.count(1)
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._has_subscribers = threading.Event()
+        self._running = True
+        self._thread = threading.Thread(target=self._broadcast, name='stream-hub', daemon=True)
+        self._thread.start()
+
+    def subscribe(self):
+        sub = Subscriber(next(self._ids), self.max_queue)
+        with self._lock:
+            self._subscribers[sub.id] = sub
+            self._has_subscribers.set()
+        return sub
+
+    def unsubscribe(self, sub):
+        sub.close()
+        with self._lock:
+            self._subscribers.pop(sub.id, None)
+            if not self._subscribers:
+                self._has_subscribers.clear()
+
+    def stop(self):
+        self._running = False
+        self._has_subscribers.set()
+        self._thread.join(timeout=2.0)
+
+    def stats(self):
+        with self._lock:
+            subscribers = list(self._subscribers.values())
+        return {
+            'encoded': self.encoded,
+            'seq': self.seq,
+            'errors': self.errors,
+            'pacing': self.pacer.stats(),
+            'clients': [sub.stats(self.seq) for sub in subscribers],
+        }
+
+    def _encode(self, image):
+        pacer = self.pacer
+        if pacer.scale < 1.0:
+            image = cv2.resize(image, None, fx=pacer.scale, fy=pacer.scale, interpolation=cv2.INTER_AREA)
+        ok, jpeg = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, pacer.quality])
+        return jpeg.tobytes() if ok else None
+
+    def _broadcast(self):
+        pacer = self.pacer
+        seq = 0
+        while self._running:
+            # 没有客户端时不编码
+            if not self._has_subscribers.is_set():
+                if self._has_subscribers.wait(timeout=1.0):
+                    pacer.resume()
+                continue
+            pacer.wait()
+
+            t0 = time.perf_counter()
+            new_seq, frame = self.camera.wait_frame(seq, timeout=pacer.frame_timeout())
+            if frame is None:
+                # 视频源暂时没有新帧，下次等待更久，不空转
+                pacer.miss()
+                continue
+            seq = new_seq
+            t1 = time.perf_counter()
+            try:
+                image = self.annotate(frame, seq)
+                t2 = time.perf_counter()
+                data = self._encode(image)
+            except Exception as e:
+                # 跳过这一帧，广播线程不能退出，否则所有客户端都会卡住；同样的错误只打印一次
+                self.errors += 1
+                if str(e) != self._last_error:
+                    self._last_error = str(e)
+                    print(f"视频流绘制或编码出错，跳过该帧: {e}")
+                continue
+            t3 = time.perf_counter()
+            pacer.done({'wait': t1 - t0, 'annotate': t2 - t1, 'encode': t3 - t2})
+            if data is None:
+                continue
+            self.encoded += 1
+            self.seq = seq
+
+            with self._lock:
+                subscribers = list(self._subscribers.values())
+            for sub in subscribers:
+                sub.push(seq, data)
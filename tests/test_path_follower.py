@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+路径跟随测试
+需要ROS环境（car_control 在导入时初始化ROS），没有ROS时跳过。
+
+运行:
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import path_follower
+    from car_control import get_controller
+except (ImportError, SystemExit):
+    path_follower = None
+
+
+@unittest.skipIf(path_follower is None, "没有ROS环境")
+class ExternalCancelTest(unittest.TestCase):
+
+    def test_controller_cancel_from_another_thread_stops_the_corridor(self):
+        matrix = [[0] * 8]
+        positions = []
+        result = []
+
+        def progress(step, total, position, heading):
+            positions.append(tuple(position))
+
+        def follow():
+            result.append(path_follower.follow_path(matrix, 0, 0, 0, 7, move_time=0.1, settle_time=0,
+                                                    initial_heading=90.0, use_cache=False, progress=progress))
+
+        controller = get_controller()
+        thread = threading.Thread(target=follow)
+        thread.start()
+        # 7格的直行段需要0.7秒，执行到一半时直接停车
+        time.sleep(0.35)
+        controller.cancel()
+        thread.join(timeout=5.0)
+
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(result, [False])
+        self.assertTrue(controller.idle())
+        # 位置按已行驶的时间估计，不会被当成已经到达直行段的终点
+        self.assertNotIn((0, 7), positions)
+
+    def test_epoch_reports_cancel(self):
+        controller = get_controller()
+        epoch = controller.command('forward', 0.05)
+        self.assertTrue(controller.wait(timeout=1.0))
+        self.assertFalse(controller.cancelled(epoch))
+        epoch = controller.command('forward', 1.0)
+        threading.Timer(0.05, controller.cancel).start()
+        self.assertTrue(controller.wait(timeout=1.0))
+        self.assertTrue(controller.cancelled(epoch))
+
+
+if __name__ == "__main__":
+    unittest.main()
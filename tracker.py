@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+多目标跟踪
+SORT 风格的跟踪器：每个目标一个匀速卡尔曼滤波器，状态为 [cx, cy, s, r, vcx, vcy, vs]
+（中心点、面积、宽高比及其速度），检测框与预测框按 IoU 贪心匹配。所有目标的预测和更新用 NumPy 批量计算。
+
+检测只需要以较低的帧率运行：两次检测之间的帧用卡尔曼滤波的速度外推目标位置，
+检测偶尔漏掉目标时轨迹保留 max_missed 次检测，画面上的框不再闪烁，目标编号也保持不变。
+时间以视频帧序号为单位。
+"""
+
+import threading
+
+import numpy as np
+
+from inference_worker import Detections
+
+# 状态协方差初值、过程噪声、测量噪声，与 SORT 相同
+_P0 = np.diag([10.0, 10.0, 10.0, 10.0, 1e4, 1e4, 1e4])
+_Q = np.diag([1.0, 1.0, 1.0, 1.0, 1e-2, 1e-2, 1e-4])
+_R = np.diag([1.0, 1.0, 10.0, 10.0])
+
+
+def xyxy_to_z(boxes):
+    """(N, 4) xyxy -> (N, 4) [cx, cy, 面积, 宽高比]"""
+    w = boxes[:, 2] - boxes[:, 0]
+    h = np.maximum(boxes[:, 3] - boxes[:, 1], 1e-6)
+    return np.stack([boxes[:, 0] + w / 2, boxes[:, 1] + h / 2, w * h, w / h], axis=1)
+
+
+def z_to_xyxy(z):
+    """(N, >=4) [cx, cy, 面积, 宽高比, ...] -> (N, 4) xyxy"""
+    area = np.maximum(z[:, 2], 0)
+    w = np.sqrt(area * np.maximum(z[:, 3], 0))
+    h = area / np.maximum(w, 1e-6)
+    return np.stack([z[:, 0] - w / 2, z[:, 1] - h / 2, z[:, 0] + w / 2, z[:, 1] + h / 2], axis=1)
+
+
+def iou_matrix(a, b):
+    """(N, 4) 与 (M, 4) xyxy 框两两之间的 IoU，返回 (N, M)"""
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-6)
+
+
+def greedy_match(scores, threshold):
+    """按得分从高到低贪心匹配，返回 [(行, 列)]，得分低于 threshold 的不匹配"""
+    rows, cols = np.nonzero(scores >= threshold)
+    order = np.argsort(-scores[rows, cols], kind='stable')
+    used_rows, used_cols, matches = set(), set(), []
+    for k in order:
+        r, c = rows[k], cols[k]
+        if r not in used_rows and c not in used_cols:
+            used_rows.add(r)
+            used_cols.add(c)
+            matches.append((r, c))
+    return matches
+
+
+class Tracks(Detections):
+    """跟踪结果：在 Detections 的基础上增加目标编号，标签显示为 "#编号 类别" """
+
+    def __init__(self, frame_id, ids, boxes, classes, scores, names, missed):
+        super(Tracks, self).__init__(frame_id, boxes, classes, scores, names)
+        self.ids = ids
+        self.missed = missed
+
+    def label(self, i):
+        return "#{} {}".format(int(self.ids[i]), super(Tracks, self).label(i))
+
+    def as_dict(self):
+        result = super(Tracks, self).as_dict()
+        result['ids'] = self.ids.tolist()
+        result['labels'] = [Detections.label(self, i) for i in range(len(self))]
+        result['missed'] = self.missed.tolist()
+        return result
+
+    def compact(self):
+        result = super(Tracks, self).compact()
+        result['i'] = self.ids.tolist()
+        return result
+
+
+class MultiTracker:
+    """
+    一路视频的多目标跟踪器，线程安全
+
+    参数:
+        iou_threshold: 检测框与预测框匹配所需的最小IoU
+        max_missed: 连续多少次检测没有匹配到时删除轨迹
+        min_hits: 轨迹至少匹配多少次后才输出，过滤偶然的误检
+        max_predict: 从最后一次检测向后外推的最大帧数，超过后框停在原处
+    """
+
+    def __init__(self, iou_threshold=0.3, max_missed=5, min_hits=2, max_predict=15):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.min_hits = min_hits
+        self.max_predict = max_predict
+        self.names = {}
+        self.frame_id = 0           # 滤波器状态对应的帧序号（最近一次检测）
+        self.next_id = 1
+        self.x = np.zeros((0, 7))
+        self.P = np.zeros((0, 7, 7))
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.classes = np.zeros(0, dtype=np.int32)
+        self.scores = np.zeros(0, dtype=np.float32)
+        self.hits = np.zeros(0, dtype=np.int64)
+        self.missed = np.zeros(0, dtype=np.int64)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _predict(self, dt):
+        if not len(self.x) or dt <= 0:
+            return
+        F = np.eye(7)
+        F[0, 4] = F[1, 5] = F[2, 6] = dt
+        # 面积不能预测成负数
+        self.x[self.x[:, 2] + self.x[:, 6] * dt <= 0, 6] = 0
+        self.x = self.x @ F.T
+        self.P = np.einsum('ij,njk,lk->nil', F, self.P, F) + _Q * dt
+
+    def update(self, detections):
+        """
+        用一帧的检测结果更新跟踪器，detections 为 inference_worker.Detections
+
+        帧序号不比上一次新的检测结果会被忽略，因此可以对同一个结果重复调用。
+        """
+        with self._lock:
+            if detections.frame_id <= self.frame_id:
+                return
+            self.names = detections.names
+            self._predict(detections.frame_id - self.frame_id)
+            self.frame_id = detections.frame_id
+
+            boxes = np.asarray(detections.boxes, dtype=np.float64).reshape(-1, 4)
+            classes = np.asarray(detections.classes, dtype=np.int32)
+            scores = np.asarray(detections.scores, dtype=np.float32)
+            if len(self.x) and len(boxes):
+                iou = iou_matrix(z_to_xyxy(self.x), boxes)
+                # 只在同一类别之间匹配
+                iou[self.classes[:, None] != classes[None, :]] = 0
+                matches = greedy_match(iou, self.iou_threshold)
+            else:
+                matches = []
+
+            if matches:
+                rows, cols = (np.array(v) for v in zip(*matches))
+                # 批量卡尔曼更新，测量矩阵 H = [I4 0]
+                P = self.P[rows]
+                y = xyxy_to_z(boxes[cols]) - self.x[rows, :4]
+                S = P[:, :4, :4] + _R
+                K = P[:, :, :4] @ np.linalg.inv(S)
+                self.x[rows] += np.einsum('nij,nj->ni', K, y)
+                self.P[rows] = P - K @ P[:, :4, :]
+                self.scores[rows] = scores[cols]
+                self.hits[rows] += 1
+                self.missed[rows] = 0
+            matched_rows = {r for r, _ in matches}
+            matched_cols = {c for _, c in matches}
+            unmatched = np.array([r not in matched_rows for r in range(len(self.x))], dtype=bool)
+            self.missed[unmatched] += 1
+
+            # 删除长时间没有匹配的轨迹
+            keep = self.missed <= self.max_missed
+            self.x, self.P = self.x[keep], self.P[keep]
+            self.ids, self.classes = self.ids[keep], self.classes[keep]
+            self.scores, self.hits, self.missed = self.scores[keep], self.hits[keep], self.missed[keep]
+
+            # 没有匹配的检测框建立新轨迹
+            new = np.array([c for c in range(len(boxes)) if c not in matched_cols], dtype=np.int64)
+            if len(new):
+                x = np.zeros((len(new), 7))
+                x[:, :4] = xyxy_to_z(boxes[new])
+                self.x = np.concatenate([self.x, x])
+                self.P = np.concatenate([self.P, np.repeat(_P0[None], len(new), axis=0)])
+                self.ids = np.concatenate([self.ids, np.arange(self.next_id, self.next_id + len(new))])
+                self.next_id += len(new)
+                self.classes = np.concatenate([self.classes, classes[new]])
+                self.scores = np.concatenate([self.scores, scores[new]])
+                self.hits = np.concatenate([self.hits, np.ones(len(new), dtype=np.int64)])
+                self.missed = np.concatenate([self.missed, np.zeros(len(new), dtype=np.int64)])
+
+    def tracks(self, frame_id=None):
+        """
+        已确认的轨迹在 frame_id 时的位置（按速度外推，不改变滤波器状态）
+
+        返回 Tracks，frame_id 为 None 时返回最近一次检测时的位置
+        """
+        with self._lock:
+            confirmed = self.hits >= self.min_hits
+            x = self.x[confirmed, :4].copy()
+            dt = 0 if frame_id is None else min(max(frame_id - self.frame_id, 0), self.max_predict)
+            if dt:
+                x[:, :3] += self.x[confirmed, 4:] * dt
+            return Tracks(self.frame_id if frame_id is None else frame_id, self.ids[confirmed],
+                          z_to_xyxy(x).astype(np.float32), self.classes[confirmed], self.scores[confirmed],
+                          self.names, self.missed[confirmed])
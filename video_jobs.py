@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+离线视频检测任务
+/start_video_detection 提交的视频文件或RTSP地址在独立的子进程中用 ultralytics 的
+predict(stream=True) 逐批检测，不占用Flask的工作线程，也不打开GUI窗口。
+每一帧的检测结果写成一行JSON（NDJSON），子进程定期把进度和处理帧率发回主进程，可以随时取消。
+
+子进程运行的就是本文件，也可以单独使用:
+    python video_jobs.py video.mp4 results.ndjson --options '{"weights": "yolo11n.pt", "batch": 8}'
+"""
+
+import argparse
+import datetime
+import itertools
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+# 子进程向主进程报告进度的间隔(秒)
+PROGRESS_INTERVAL = 0.5
+# 子进程标准输出中进度消息的前缀，其他输出（例如 ultralytics 的日志）被忽略
+PROGRESS_PREFIX = '@progress '
+
+DEFAULT_OPTIONS = {
+    'weights': 'yolo11n.pt',
+    'conf': 0.25,
+    'iou': 0.45,
+    'imgsz': 640,
+    'batch': 4,
+    'vid_stride': 1,
+    'device': None,
+    'save': False,          # 是否同时保存画好检测框的视频
+    'project': None,        # save 为 True 时视频的保存目录
+}
+
+
+def run_job(source, output, options, report, cancelled):
+    """
+    逐帧检测 source 并把结果写入 output（NDJSON）
+
+    第一行是视频源和类别名，之后每帧一行 {"frame", "boxes"(xyxy), "classes", "scores"}。
+    report(state, info) 报告进度，cancelled() 返回 True 时提前结束。返回处理的帧数。
+    """
+    import cv2
+    from ultralytics import YOLO
+
+    # 视频文件可以知道总帧数，RTSP视频流没有总帧数
+    total = 0
+    capture = cv2.VideoCapture(source)
+    if capture.isOpened():
+        total = max(int(capture.get(cv2.CAP_PROP_FRAME_COUNT)), 0) // max(options['vid_stride'], 1)
+    capture.release()
+
+    model = YOLO(options['weights'])
+    results = model.predict(source=source, stream=True, verbose=False, show=False,
+                            conf=options['conf'], iou=options['iou'], imgsz=options['imgsz'],
+                            batch=options['batch'], vid_stride=options['vid_stride'],
+                            device=options['device'] or None, save=options['save'],
+                            project=options['project'], name=os.path.splitext(os.path.basename(output))[0])
+    report('running', {'total': total})
+
+    frames = 0
+    started = reported = time.perf_counter()
+    with open(output, 'w') as out:
+        out.write(json.dumps({'source': str(source), 'names': dict(model.names)}, ensure_ascii=False) + '\n')
+        for result in results:
+            boxes = result.boxes
+            out.write(json.dumps({
+                'frame': frames,
+                'boxes': boxes.xyxy.cpu().numpy().astype(float).round(1).tolist(),
+                'classes': boxes.cls.cpu().numpy().astype(int).tolist(),
+                'scores': boxes.conf.cpu().numpy().astype(float).round(3).tolist(),
+            }, separators=(',', ':')) + '\n')
+            frames += 1
+            now = time.perf_counter()
+            if now - reported >= PROGRESS_INTERVAL:
+                reported = now
+                report('running', {'frames': frames, 'fps': frames / (now - started)})
+            if cancelled():
+                break
+    elapsed = time.perf_counter() - started
+    report('cancelled' if cancelled() else 'done',
+           {'frames': frames, 'fps': frames / elapsed if elapsed > 0 else 0.0})
+    return frames
+
+
+class VideoJob:
+    """一个离线视频检测任务的状态"""
+
+    def __init__(self, job_id, source, output, options):
+        self.id = job_id
+        self.source = source
+        self.output = output
+        self.options = options
+        # queued / running / done / failed / cancelled
+        self.state = 'queued'
+        self.frames = 0
+        self.total = 0
+        self.fps = 0.0
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.process = None
+
+    def as_dict(self):
+        return {
+            'job_id': self.id,
+            'source': str(self.source),
+            'state': self.state,
+            'frames': self.frames,
+            'total': self.total,
+            'progress': min(self.frames / float(self.total), 1.0) if self.total else None,
+            'fps': self.fps,
+            'output': self.output,
+            'error': self.error,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+        }
+
+
+class VideoJobRunner:
+    """
+    离线视频检测任务队列
+
+    参数:
+        directory: 结果文件目录
+        max_running: 同时运行的子进程数，其余任务排队
+        history: 保留状态以供查询的任务数
+        options: 覆盖 DEFAULT_OPTIONS 中的 predict 参数
+    """
+
+    def __init__(self, directory, max_running=1, history=50, **options):
+        self.directory = directory
+        self.max_running = max_running
+        self.history = history
+        self.options = dict(DEFAULT_OPTIONS, project=directory)
+        self.options.update(options)
+        self._ids = itertools.count(1)
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def submit(self, source, **options):
+        """提交一个视频文件或视频流地址，立即返回 VideoJob；options 覆盖默认的 predict 参数"""
+        job_id = next(self._ids)
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(self.directory, "job_{}_{}.ndjson".format(job_id, stamp))
+        job = VideoJob(job_id, source, output, dict(self.options, **options))
+        with self._lock:
+            self._jobs[job_id] = job
+            # 只删除已经结束的旧任务
+            for old_id in list(self._jobs):
+                if len(self._jobs) <= self.history:
+                    break
+                if self._jobs[old_id].finished is not None:
+                    del self._jobs[old_id]
+        self._start_queued()
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.as_dict() if job is not None else None
+
+    def list(self):
+        with self._lock:
+            return [job.as_dict() for job in self._jobs.values()]
+
+    def cancel(self, job_id):
+        """取消任务，返回是否找到了还未结束的任务"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished is not None:
+                return False
+            if job.process is None:
+                self._finish(job, 'cancelled')
+            else:
+                # 子进程收到 SIGTERM 后写完当前帧再退出
+                job.process.terminate()
+            return True
+
+    def _finish(self, job, state, error=None):
+        job.state = state
+        job.error = error
+        job.finished = time.time()
+
+    def _start_queued(self):
+        with self._lock:
+            running = sum(1 for job in self._jobs.values() if job.process is not None and job.finished is None)
+            for job in self._jobs.values():
+                if running >= self.max_running:
+                    break
+                if job.state != 'queued' or job.process is not None:
+                    continue
+                command = [sys.executable, os.path.abspath(__file__), str(job.source), job.output,
+                           '--options', json.dumps(job.options)]
+                try:
+                    job.process = subprocess.Popen(command, stdout=subprocess.PIPE, universal_newlines=True)
+                except OSError as e:
+                    self._finish(job, 'failed', str(e))
+                    continue
+                job.state = 'running'
+                job.started = time.time()
+                threading.Thread(target=self._watch, args=(job,), name='video-job', daemon=True).start()
+                running += 1
+
+    def _watch(self, job):
+        """读取子进程报告的进度，子进程结束后启动下一个排队的任务"""
+        final = None
+        for line in job.process.stdout:
+            if not line.startswith(PROGRESS_PREFIX):
+                continue
+            message = json.loads(line[len(PROGRESS_PREFIX):])
+            with self._lock:
+                job.total = message.get('total', job.total)
+                job.frames = message.get('frames', job.frames)
+                job.fps = message.get('fps', job.fps)
+            if message['state'] != 'running':
+                final = message
+        code = job.process.wait()
+        with self._lock:
+            if job.finished is None:
+                if final is not None:
+                    self._finish(job, final['state'], final.get('error'))
+                else:
+                    self._finish(job, 'failed', "子进程异常退出，退出码 {}".format(code))
+        self._start_queued()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线视频检测，每帧结果写成一行JSON")
+    parser.add_argument('source', help="视频文件或视频流地址，摄像头编号为数字")
+    parser.add_argument('output', help="结果文件(.ndjson)")
+    parser.add_argument('--options', default='{}', help="JSON格式的 predict 参数，见 DEFAULT_OPTIONS")
+    args = parser.parse_args()
+
+    options = dict(DEFAULT_OPTIONS, **json.loads(args.options))
+    source = int(args.source) if args.source.isdigit() else args.source
+    cancel = threading.Event()
+    # 主进程用 terminate() 取消任务
+    signal.signal(signal.SIGTERM, lambda signum, frame: cancel.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: cancel.set())
+
+    def report(state, info):
+        info['state'] = state
+        sys.stdout.write(PROGRESS_PREFIX + json.dumps(info) + '\n')
+        sys.stdout.flush()
+
+    try:
+        run_job(source, args.output, options, report, cancel.is_set)
+    except Exception as e:
+        report('failed', {'error': str(e)})
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()